@@ -0,0 +1,156 @@
+import argparse
+import sys
+from itertools import islice
+from math import ceil
+
+import numpy as np
+
+# Usage: python3 eclat.py [-s PCT | -S COUNT] [-m MAX] <dataset> [out_file]
+# In-process alternative to the apriori/fpgrowth binaries run by q1_1.sh:
+# same transaction files in, same "item item ... (support%)" lines out.
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        """Set bits per row of a (m, W) uint64 bitset matrix."""
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+else:
+    _BYTE_BITS = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Set bits per row of a (m, W) uint64 bitset matrix."""
+        return _BYTE_BITS[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+# Transactions per loading block (a multiple of 64: blocks fill whole words)
+READ_BLOCK = 1 << 14
+
+
+def iter_transactions(path):
+    """Whitespace-separated transactions, one per line, streamed as token lists."""
+    with open(path, "r") as f:
+        for line in f:
+            txn = line.split()
+            if txn:
+                yield txn
+
+
+def read_tidsets(transactions):
+    """
+    Streams transactions into packed tidsets, READ_BLOCK at a time: bit t of
+    row i of a block is set iff its transaction t contains item i (duplicates
+    within a transaction set the same bit). Only the bitsets are kept.
+    Returns (names in first-seen order, list of (items seen so far,
+    READ_BLOCK // 64) uint64 blocks, number of transactions).
+    """
+    ids = {}
+    get = ids.setdefault
+    blocks = []
+    n = 0
+    it = iter(transactions)
+    while True:
+        block = list(islice(it, READ_BLOCK))
+        if not block:
+            break
+        lens = np.fromiter(map(len, block), dtype=np.int64, count=len(block))
+        items = np.fromiter((get(x, len(ids)) for txn in block for x in txn), dtype=np.int64,
+                            count=int(lens.sum()))
+        tids = np.repeat(np.arange(len(block), dtype=np.uint64), lens)
+        bits = np.zeros((len(ids), READ_BLOCK // 64), dtype=np.uint64)
+        np.bitwise_or.at(bits, (items, tids >> np.uint64(6)), np.uint64(1) << (tids & np.uint64(63)))
+        blocks.append(bits)
+        n += len(block)
+    return list(ids), blocks, n
+
+
+def vertical_bitsets(names, blocks, n, min_count):
+    """
+    Vertical layout of the frequent items, assembled from read_tidsets blocks.
+    Rows are sorted by ascending support, the usual Eclat order (the smallest
+    tidsets are intersected first).
+    Returns (names, bitsets (m, W) uint64, counts (m,)).
+    """
+    counts = np.zeros(len(names), dtype=np.int64)
+    for bits in blocks:
+        counts[:bits.shape[0]] += popcount(bits)
+
+    order = np.argsort(counts, kind="stable")
+    order = order[counts[order] >= min_count]
+
+    # Only the frequent rows are copied out of the blocks
+    W = (n + 63) // 64
+    step = READ_BLOCK // 64
+    bitsets = np.zeros((order.size, len(blocks) * step), dtype=np.uint64)
+    for b, bits in enumerate(blocks):
+        seen = order < bits.shape[0]
+        bitsets[seen, b * step:(b + 1) * step] = bits[order[seen]]
+    return np.array(names, dtype=object)[order], bitsets[:, :W], counts[order]
+
+
+def _extend(prefix, ids, bitsets, counts, min_count, max_len):
+    for i in range(ids.size):
+        items = prefix + (int(ids[i]),)
+        yield items, int(counts[i])
+        if i + 1 == ids.size or len(items) == max_len:
+            continue
+
+        # Tidsets of items + each later item, all intersected at once
+        inter = bitsets[i + 1:] & bitsets[i]
+        c = popcount(inter)
+        keep = c >= min_count
+        if keep.any():
+            yield from _extend(items, ids[i + 1:][keep], inter[keep], c[keep], min_count, max_len)
+
+
+def eclat(bitsets, counts, min_count, max_len=None):
+    """
+    Depth-first Eclat over vertical bitsets (AND + popcount per extension).
+    Yields (tuple of item rows, support count) for every frequent itemset.
+    """
+    ids = np.arange(counts.size)
+    return _extend((), ids, bitsets, counts, min_count, max_len or counts.size)
+
+
+def mine(transactions, min_count, max_len=None):
+    """Frequent itemsets of token-list transactions: yields (tuple of item names, support count)."""
+    names, bitsets, counts = vertical_bitsets(*read_tidsets(transactions), min_count)
+    for items, count in eclat(bitsets, counts, min_count, max_len):
+        yield tuple(names[list(items)]), count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python3 eclat.py [-s PCT | -S COUNT] [-m MAX] <dataset> [out_file]",
+        description="Frequent itemset mining with vertical bitsets (Eclat).")
+    parser.add_argument("dataset")
+    parser.add_argument("out_file", nargs="?", help="default: stdout")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-s", type=float, default=10.0, metavar="PCT",
+                       help="minimum support in percent of transactions (default: 10)")
+    group.add_argument("-S", type=int, metavar="COUNT", help="minimum support as a transaction count")
+    parser.add_argument("-m", type=int, metavar="MAX", help="maximum itemset size")
+    args = parser.parse_args()
+
+    names, blocks, n = read_tidsets(iter_transactions(args.dataset))
+    min_count = max(1, args.S if args.S is not None else ceil(args.s / 100 * n))
+    names, bitsets, counts = vertical_bitsets(names, blocks, n, min_count)
+    del blocks
+
+    out = open(args.out_file, "w") if args.out_file else sys.stdout
+    total = 0
+    batch = []
+    for rows, count in eclat(bitsets, counts, min_count, args.m):
+        items = names[list(rows)]
+        batch.append(f"{' '.join(items)} ({100 * count / n:g})\n")
+        if len(batch) >= 65536:
+            out.write("".join(batch))
+            total += len(batch)
+            batch = []
+    out.write("".join(batch))
+    total += len(batch)
+    if out is not sys.stdout:
+        out.close()
+
+    print(f"{total} frequent itemsets (minsup={min_count} of {n} transactions)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
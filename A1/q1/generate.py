@@ -1,40 +1,52 @@
-import random
+import argparse
+import numpy as np
+from txn_utils import BATCH, item_universe, sample_k, write_transactions
+
+def make_batches(rng, core_items, medium_items, rare_items, batch=BATCH):
+    """Endless bitmask batches of the core / medium / rare model."""
+    names, (core, medium, rare) = item_universe(core_items, medium_items, rare_items)
+
+    while True:
+        mask = np.zeros((batch, len(names)), dtype=bool)
+
+        # core items (almost always)
+        with_core = rng.random(batch) < 0.9
+        mask[with_core, core] = True
+
+        # medium-frequency items
+        k_med = rng.integers(3, 9, batch)
+        mask[:, medium] = sample_k(rng, batch, len(medium_items), k_med)
+
+        # rare items
+        k_rare = np.where(rng.random(batch) < 0.3, rng.integers(1, 3, batch), 0)
+        mask[:, rare] = sample_k(rng, batch, len(rare_items), k_rare)
+
+        yield mask, names
 
 def generate_dataset(
     core_items,
     medium_items,
     rare_items,
     num_transactions,
-    out_file
+    out_file,
+    seed=None
 ):
-    seen = set()
-
-    with open(out_file, "w") as f:
-        while len(seen) < num_transactions:
-            txn = set()
-
-            # core items (almost always)
-            if random.random() < 0.9:
-                txn.update(core_items)
-
-            # medium-frequency items
-            k_med = random.randint(3, 8)
-            txn.update(random.sample(medium_items, k_med))
-
-            # rare items
-            if random.random() < 0.3:
-                k_rare = random.randint(1, 2)
-                txn.update(random.sample(rare_items, k_rare))
-
-            txn = tuple(sorted(txn))
-            if txn in seen:
-                continue
-
-            seen.add(txn)
-            f.write(" ".join(txn) + "\n")
-core_items   = [f"C{i}" for i in range(6)]
-medium_items = [f"M{i}" for i in range(80)]
-rare_items   = [f"R{i}" for i in range(300)]
-generate_dataset(core_items, medium_items, rare_items,
-                 num_transactions=15000,
-                 out_file="generated_transactions.dat")
+    rng = np.random.default_rng(seed)
+    batch = min(BATCH, num_transactions * 2)
+    batches = make_batches(rng, core_items, medium_items, rare_items, batch)
+    return write_transactions(out_file, batches, num_transactions)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_transactions", type=int, default=15000)
+    parser.add_argument("--out_file", default="generated_transactions.dat")
+    parser.add_argument("--seed", type=int, help="random seed (default: fresh entropy)")
+    args = parser.parse_args()
+
+    core_items   = [f"C{i}" for i in range(6)]
+    medium_items = [f"M{i}" for i in range(80)]
+    rare_items   = [f"R{i}" for i in range(300)]
+    generate_dataset(core_items, medium_items, rare_items,
+                     num_transactions=args.num_transactions,
+                     out_file=args.out_file,
+                     seed=args.seed)
@@ -1,44 +1,63 @@
-import random
-
-def generate_dataset(num_transactions, out_file):
-    seen = set()
-    attempts = 0
-    max_attempts = num_transactions * 20
-
-    # Medium-frequency pool (Apriori poison)
-    poison_items = [f"P{i}" for i in range(60)]
-
-    # Rare noise
-    rare_items = [f"R{i}" for i in range(200)]
-
-    with open(out_file, "w") as f:
-        while len(seen) < num_transactions and attempts < max_attempts:
-            attempts += 1
-            txn = set()
-
-            # 70% transactions are dense and overlapping
-            if random.random() < 0.7:
-                k = random.randint(15, 25)
-                txn.update(random.sample(poison_items, k))
-            else:
-                k = random.randint(5, 10)
-                txn.update(random.sample(poison_items, k))
-
-            # add noise
-            if random.random() < 0.3:
-                txn.update(random.sample(rare_items, 1))
-
-            txn_tuple = tuple(sorted(txn))
-            if txn_tuple in seen:
-                continue
-
-            seen.add(txn_tuple)
-            f.write(" ".join(txn_tuple) + "\n")
-
-    print(f"Generated {len(seen)} transactions")
+import argparse
+import numpy as np
+from txn_utils import BATCH, item_universe, write_transactions
+
+# Rare noise: with probability P_NOISE a transaction gets one of these
+NUM_RARE = 200
+P_NOISE = 0.3
+
+def make_batches(rng, cluster_size, p_in, num_bridge_items, p_bridge, batch=BATCH):
+    """
+    Endless bitmask batches of the "Apriori poison" model:
+      - every item of a cluster of cluster_size medium-frequency items (P*)
+        independently with probability p_in: many overlapping dense
+        transactions with a huge number of frequent combinations,
+      - every bridge item (B*) independently with probability p_bridge,
+      - with probability P_NOISE one rare item (R*).
+    """
+    poison_items = [f"P{i}" for i in range(cluster_size)]
+    bridge_items = [f"B{i}" for i in range(num_bridge_items)]
+    rare_items = [f"R{i}" for i in range(NUM_RARE)]
+    names, (poison, bridge, rare) = item_universe(poison_items, bridge_items, rare_items)
+
+    while True:
+        mask = np.zeros((batch, len(names)), dtype=bool)
+        mask[:, poison] = rng.random((batch, cluster_size), dtype=np.float32) < p_in
+        mask[:, bridge] = rng.random((batch, num_bridge_items), dtype=np.float32) < p_bridge
+
+        # add noise
+        noisy = np.flatnonzero(rng.random(batch) < P_NOISE)
+        mask[noisy, rare.start + rng.integers(0, NUM_RARE, noisy.size)] = True
+        yield mask, names
+
+def generate_dataset(num_transactions, out_file, cluster_size=60, p_in=0.27,
+                     num_bridge_items=0, p_bridge=0.3, seed=None):
+    # Give up after drawing 20x the requested count (tiny universes cannot
+    # have that many distinct transactions)
+    max_batches = max(1, -(-num_transactions * 20 // BATCH))
+    batch = min(BATCH, num_transactions * 20)
+
+    rng = np.random.default_rng(seed)
+    batches = make_batches(rng, cluster_size, p_in, num_bridge_items, p_bridge, batch)
+    limited = (next(batches) for _ in range(max_batches))
+    written = write_transactions(out_file, limited, num_transactions)
+
+    print(f"Generated {written} transactions")
 
 # ---- RUN ----
-generate_dataset(
-    num_transactions=15000,
-    out_file="generated_transactions.dat"
-)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_transactions", type=int, default=15000)
+    parser.add_argument("--out_file", default="generated_transactions.dat")
+    parser.add_argument("--cluster_size", type=int, default=60,
+                        help="medium-frequency (poison) items")
+    parser.add_argument("--p_in", type=float, default=0.27,
+                        help="probability of each poison item in a transaction")
+    parser.add_argument("--num_bridge_items", type=int, default=0)
+    parser.add_argument("--p_bridge", type=float, default=0.3,
+                        help="probability of each bridge item in a transaction")
+    parser.add_argument("--seed", type=int, help="random seed (default: fresh entropy)")
+    args = parser.parse_args()
+
+    generate_dataset(args.num_transactions, args.out_file, args.cluster_size, args.p_in,
+                     args.num_bridge_items, args.p_bridge, args.seed)
@@ -1,3 +1,4 @@
+import os
 import re
 import sys
 
@@ -15,6 +16,7 @@ def to_seconds(t):
 supports = [5,10,25,50,90]
 ap_times = []
 fp_times = []
+ec_times = []
 
 out_dir = sys.argv[1] if len(sys.argv) > 1 else "full_out"
 csv_file = sys.argv[2] if len(sys.argv) > 2 else "times.csv"
@@ -28,13 +30,28 @@ for s in supports:
         match = re.search(r"Elapsed.*:\s*([0-9:.]+)", f.read())
         fp_times.append(to_seconds(match.group(1)))
 
+    # Eclat (eclat.py) timings only exist when q1_1.sh ran with --eclat
+    if os.path.exists(f"{out_dir}/ec{s}_time.txt"):
+        with open(f"{out_dir}/ec{s}_time.txt") as f:
+            match = re.search(r"Elapsed.*:\s*([0-9:.]+)", f.read())
+            ec_times.append(to_seconds(match.group(1)))
+
+has_eclat = len(ec_times) == len(supports)
+
 print("Output directory:", out_dir)
 print("Apriori (s):", ap_times)
 print("FP-Growth (s):", fp_times)
+if has_eclat:
+    print("Eclat (s):", ec_times)
 
 with open(csv_file, "w") as f:
-    f.write("support,apriori,fpgrowth\n")
-    for s, a, fp in zip(supports, ap_times, fp_times):
-        f.write(f"{s},{a},{fp}\n")
+    if has_eclat:
+        f.write("support,apriori,fpgrowth,eclat\n")
+        for s, a, fp, ec in zip(supports, ap_times, fp_times, ec_times):
+            f.write(f"{s},{a},{fp},{ec}\n")
+    else:
+        f.write("support,apriori,fpgrowth\n")
+        for s, a, fp in zip(supports, ap_times, fp_times):
+            f.write(f"{s},{a},{fp}\n")
 
 print(f"Times written to {csv_file}")
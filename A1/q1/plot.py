@@ -8,6 +8,7 @@ csv_file = sys.argv[1] if len(sys.argv) > 1 else "times.csv"
 supports = []
 apriori = []
 fpgrowth = []
+eclat = []
 
 with open(csv_file, "r") as f:
     reader = csv.DictReader(f)
@@ -15,9 +16,13 @@ with open(csv_file, "r") as f:
         supports.append(int(row["support"]))
         apriori.append(float(row["apriori"]))
         fpgrowth.append(float(row["fpgrowth"]))
+        if row.get("eclat"):
+            eclat.append(float(row["eclat"]))
 
 plt.plot(supports, apriori, marker='o', label='Apriori')
 plt.plot(supports, fpgrowth, marker='o', label='FP-Growth')
+if len(eclat) == len(supports):
+    plt.plot(supports, eclat, marker='o', label='Eclat (eclat.py)')
 
 plt.xlabel("Minimum Support (%)")
 plt.ylabel("Runtime (seconds)")
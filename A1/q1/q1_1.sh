@@ -4,6 +4,8 @@ APRIORI=$1
 FPGROWTH=$2
 DATASET=$3
 OUTDIR=$4
+# Optional 5th argument "--eclat": also time the in-process miner (eclat.py)
+ECLAT=${5:-""}
 
 mkdir -p "$OUTDIR"
 
@@ -26,6 +28,12 @@ EOF
     echo "FP-Growth @ ${S}% (minsup=$SUPP_COUNT)"
     /usr/bin/time -v "$FPGROWTH" -S"$SUPP_COUNT" "$DATASET" \
         > "$OUTDIR/fp${S}" 2> "$OUTDIR/fp${S}_time.txt"
+
+    if [ "$ECLAT" = "--eclat" ]; then
+        echo "Eclat @ ${S}% (minsup=$SUPP_COUNT)"
+        /usr/bin/time -v python3 eclat.py -S"$SUPP_COUNT" "$DATASET" \
+            > "$OUTDIR/ec${S}" 2> "$OUTDIR/ec${S}_time.txt"
+    fi
 done
 
 # --- Generate times CSV ---
@@ -0,0 +1,150 @@
+import numpy as np
+
+# Transactions are generated as boolean "bitmask rows" over a fixed item
+# universe, a whole batch at a time. Columns are in sorted item-name order,
+# so the items of every written line come out sorted, and each pool of
+# items is a contiguous block of columns.
+
+BATCH = 1 << 16
+
+# sample_k draws items one by one when at most pool_size / SPARSE_DRAW are needed
+SPARSE_DRAW = 16
+
+
+def item_universe(*pools):
+    """
+    All item names in sorted order, plus each pool's slice of columns.
+    Items within a pool are interchangeable for the generators, so each pool
+    is simply sorted; pools must not interleave (e.g. distinct prefixes).
+    Returns (names, slices) with slices in the order the pools were given.
+    """
+    blocks = sorted((sorted(pool), i) for i, pool in enumerate(pools) if pool)
+    names, slices = [], [slice(0, 0)] * len(pools)
+    for pool, i in blocks:
+        slices[i] = slice(len(names), len(names) + len(pool))
+        names.extend(pool)
+    if names != sorted(names):
+        raise ValueError("item pools interleave in sorted order")
+    return names, slices
+
+
+def sample_k(rng, rows, pool_size, k):
+    """(rows, pool_size) mask with exactly k[r] random members set in row r."""
+    k = np.asarray(k)
+    k_max = int(k.max(initial=0))
+    if k_max * SPARSE_DRAW <= pool_size:
+        # Few items from a large pool: draw them one at a time, redrawing the
+        # (rare) repeats, instead of ranking the whole pool for every row
+        mask = np.zeros((rows, pool_size), dtype=bool)
+        for j in range(k_max):
+            todo = np.flatnonzero(k > j)
+            while todo.size:
+                pick = rng.integers(0, pool_size, todo.size)
+                fresh = ~mask[todo, pick]
+                mask[todo[fresh], pick[fresh]] = True
+                todo = todo[~fresh]
+        return mask
+
+    # The k[r] smallest of pool_size uniform keys, via the k[r]-th smallest
+    keys = rng.random((rows, pool_size))
+    kth = np.sort(keys, axis=1)[np.arange(rows), np.maximum(k - 1, 0)]
+    return (keys <= kth[:, None]) & (k > 0)[:, None]
+
+
+def row_hashes(mask):
+    """
+    64-bit hash of every bitmask row (packed bits, FNV-style fold of the
+    words, splitmix64 finalizer). Two distinct rows collide with probability
+    ~2^-64, which dedup accepts.
+    """
+    packed = np.packbits(mask, axis=1)
+    pad = (-packed.shape[1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    words = np.ascontiguousarray(packed).view(np.uint64)
+
+    with np.errstate(over="ignore"):
+        h = np.full(mask.shape[0], 0xCBF29CE484222325, dtype=np.uint64)
+        for j in range(words.shape[1]):
+            h = (h ^ words[:, j]) * np.uint64(0x100000001B3)
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+    return h
+
+
+class RowDeduper:
+    """Hashes of every row seen so far, as one sorted uint64 array (8 bytes per row)."""
+
+    def __init__(self):
+        self.seen = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self):
+        return self.seen.size
+
+    def fresh(self, mask):
+        """Indices of rows of mask not seen before (first occurrence within the batch), in order."""
+        h = row_hashes(mask)
+        order = np.argsort(h, kind="stable")
+        hs = h[order]
+        first = np.ones(hs.size, dtype=bool)
+        first[1:] = hs[1:] != hs[:-1]
+        hs, idx = hs[first], order[first]
+
+        if self.seen.size:
+            pos = np.minimum(np.searchsorted(self.seen, hs), self.seen.size - 1)
+            new = self.seen[pos] != hs
+            hs, idx = hs[new], idx[new]
+
+        # Both runs are sorted, so the stable sort (timsort) is a linear merge
+        self.seen = np.sort(np.concatenate((self.seen, hs)), kind="stable")
+        return np.sort(idx)
+
+
+def format_rows(mask, names):
+    """
+    Text of the (non-empty) rows of mask: one line per row, item names
+    separated by spaces. Built as a single byte buffer, without per-row
+    Python: every token ("name ") is padded to whole uint64 words, so the
+    bytes of all set items are one gather plus one boolean compress.
+    """
+    tokens = [(name + " ").encode() for name in names]
+    lengths = np.array([len(t) for t in tokens], dtype=np.int64)
+    words = (int(lengths.max()) + 7) // 8
+    table = np.frombuffer(b"".join(t.ljust(8 * words, b"\0") for t in tokens),
+                          dtype=np.uint64).reshape(len(tokens), words)
+
+    cols = np.flatnonzero(mask) % mask.shape[1]
+    if cols.size == 0:
+        return b""
+    tok_len = lengths[cols]
+    chars = table[cols].view(np.uint8)
+    out = chars[np.arange(8 * words) < tok_len[:, None]]
+
+    # The trailing space of each row's last token becomes the newline
+    per_row = np.count_nonzero(mask, axis=1)
+    last_tok = np.cumsum(per_row[per_row > 0]) - 1
+    out[np.cumsum(tok_len)[last_tok] - 1] = ord("\n")
+    return out.tobytes()
+
+
+def write_transactions(out_file, batches, num_transactions):
+    """
+    Streams unique, non-empty transactions from an iterator of bitmask
+    batches (see make_batches of the generators) to out_file until
+    num_transactions are written or the batches run out.
+    Returns the number written.
+    """
+    dedup = RowDeduper()
+    written = 0
+    with open(out_file, "wb") as f:
+        for mask, names in batches:
+            mask = mask[mask.any(axis=1)]
+            keep = dedup.fresh(mask)[:num_transactions - written]
+            f.write(format_rows(mask[keep], names))
+            written += keep.size
+            if written >= num_transactions:
+                break
+    return written
@@ -1,27 +1,80 @@
 import sys
 import os
+import json
+
+# Label -> integer maps, kept next to the converted files so that re-runs
+# (and later datasets converted into the same directory) reuse the same ids
+LABEL_MAPS = "label_maps.json"
+
+WRITE_BUFFER = 1 << 20
+
+def load_label_maps(output_dir):
+    path = os.path.join(output_dir, LABEL_MAPS)
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path, 'r') as f:
+        maps = json.load(f)
+    return maps.get('node', {}), maps.get('edge', {})
+
+def save_label_maps(output_dir, node_label_map, edge_label_map):
+    path = os.path.join(output_dir, LABEL_MAPS)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'node': node_label_map, 'edge': edge_label_map}, f, indent=1)
+    os.replace(tmp, path)
+
+def iter_graphs(lines):
+    """
+    Streams graphs out of the Yeast format, one at a time:
+      #<graph id>
+      <number of nodes>, then one label per line
+      <number of edges>, then one "src dst label" per line (commas allowed)
+    `lines` are the stripped, non-empty lines of the file.
+    Yields (graph_id, node_labels, edges) with edges as (src, dst, label) strings.
+    """
+    line = next(lines, None)
+    while line is not None:
+        if not line.startswith('#'):
+            line = next(lines, None)
+            continue
+
+        graph_id = line.replace('#', '').strip()
+        nodes = []
+        edges = []
+
+        # Parse Nodes
+        line = next(lines, None)
+        if line is not None:
+            for _ in range(int(line)):
+                nodes.append(next(lines))
+            line = next(lines, None)
+
+        # Parse Edges
+        if line is not None:
+            for _ in range(int(line)):
+                parts = next(lines).replace(',', ' ').split()
+                edges.append((parts[0], parts[1], parts[2]))
+            line = next(lines, None)
+
+        yield graph_id, nodes, edges
 
 def convert_data(input_path, output_dir):
     """
-    Reads the Yeast dataset, maps string labels to integers, 
+    Reads the Yeast dataset, maps string labels to integers,
     and creates input files for gSpan, FSG, and Gaston.
+    Single pass: each graph is parsed, formatted once and written to all
+    three files before the next one is read, so memory stays constant.
     """
     gspan_file = os.path.join(output_dir, "input_gspan.txt")
     fsg_file = os.path.join(output_dir, "input_fsg.txt")
     gaston_file = os.path.join(output_dir, "input_gaston.txt")
-    
+
     print(f"Reading dataset: {input_path}")
-    
-    with open(input_path, 'r') as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    graphs = []
-    current_graph = None
-    
-    # Mappings for labels
-    node_label_map = {}
-    edge_label_map = {}
-    
+
+    # Mappings for labels, continued from earlier runs
+    node_label_map, edge_label_map = load_label_maps(output_dir)
+    known_labels = (len(node_label_map), len(edge_label_map))
+
     def get_node_id(label):
         if label not in node_label_map:
             node_label_map[label] = len(node_label_map)
@@ -32,80 +85,36 @@ def convert_data(input_path, output_dir):
             edge_label_map[label] = len(edge_label_map)
         return edge_label_map[label]
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        if line.startswith('#'):
-            if current_graph:
-                graphs.append(current_graph)
-            
-            graph_id = line.replace('#', '').strip()
-            current_graph = {'id': graph_id, 'nodes': [], 'edges': []}
-            i += 1
-            
-            # Parse Nodes
-            if i < len(lines):
-                num_nodes = int(lines[i])
-                i += 1
-                for _ in range(num_nodes):
-                    # MAP LABEL TO INTEGER
-                    original_label = lines[i]
-                    mapped_label = get_node_id(original_label)
-                    current_graph['nodes'].append(mapped_label)
-                    i += 1
-            
-            # Parse Edges
-            if i < len(lines):
-                num_edges = int(lines[i])
-                i += 1
-                for _ in range(num_edges):
-                    parts = lines[i].replace(',', ' ').split()
-                    src, dst = parts[0], parts[1]
-                    # MAP THE LABEL TO INTEGER
-                    original_label = parts[2]
-                    mapped_label = get_edge_id(original_label)
-                    current_graph['edges'].append((src, dst, mapped_label))
-                    i += 1
-        else:
-            i += 1
-            
-    if current_graph:
-        graphs.append(current_graph)
-
-    print(f"Parsed {len(graphs)} graphs.")
-    print(f"Unique Node Labels: {len(node_label_map)}")
-    print(f"Unique Edge Labels: {len(edge_label_map)}")
-
-    # Write gSpan
-    with open(gspan_file, 'w') as f:
-        for idx, g in enumerate(graphs):
-            f.write(f"t # {idx}\n")
-            for node_idx, label in enumerate(g['nodes']):
-                f.write(f"v {node_idx} {label}\n")
-            for src, dst, label in g['edges']:
-                f.write(f"e {src} {dst} {label}\n")
-        f.write("t # -1\n") 
-
-    # Write Gaston
-    with open(gaston_file, 'w') as f:
-        for idx, g in enumerate(graphs):
-            f.write(f"t # {idx}\n")
-            for node_idx, label in enumerate(g['nodes']):
-                f.write(f"v {node_idx} {label}\n")
-            for src, dst, label in g['edges']:
-                f.write(f"e {src} {dst} {label}\n")
-        # No EOF marker
-
-    # Write FSG
-    with open(fsg_file, 'w') as f:
-        for idx, g in enumerate(graphs):
-            f.write(f"t # {idx}\n")
-            for node_idx, label in enumerate(g['nodes']):
-                f.write(f"v {node_idx} {label}\n")
-            for src, dst, label in g['edges']:
-                f.write(f"u {src} {dst} {label}\n")
+    count = 0
+    with open(input_path, 'r') as f, \
+            open(gspan_file, 'w', buffering=WRITE_BUFFER) as gspan, \
+            open(gaston_file, 'w', buffering=WRITE_BUFFER) as gaston, \
+            open(fsg_file, 'w', buffering=WRITE_BUFFER) as fsg:
+        lines = (line.strip() for line in f)
+        lines = (line for line in lines if line)
+
+        for idx, (_, nodes, edges) in enumerate(iter_graphs(lines)):
+            # MAP LABELS TO INTEGERS
+            head = f"t # {idx}\n" + "".join(f"v {node_idx} {get_node_id(label)}\n"
+                                            for node_idx, label in enumerate(nodes))
+            edge_lines = [f"{src} {dst} {get_edge_id(label)}\n" for src, dst, label in edges]
+
+            # gSpan and Gaston share the text; FSG uses undirected "u" edges
+            text = head + "".join("e " + e for e in edge_lines)
+            gspan.write(text)
+            gaston.write(text)
+            fsg.write(head + "".join("u " + e for e in edge_lines))
+            count = idx + 1
+
+        gspan.write("t # -1\n")
+        # No EOF marker for Gaston and FSG
+
+    save_label_maps(output_dir, node_label_map, edge_label_map)
 
+    print(f"Parsed {count} graphs.")
+    print(f"Unique Node Labels: {len(node_label_map)} ({len(node_label_map) - known_labels[0]} new)")
+    print(f"Unique Edge Labels: {len(edge_label_map)} ({len(edge_label_map) - known_labels[1]} new)")
     print("Conversion complete.")
 
 if __name__ == "__main__":
-    convert_data(sys.argv[1], sys.argv[2])
\ No newline at end of file
+    convert_data(sys.argv[1], sys.argv[2])
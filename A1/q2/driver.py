@@ -1,87 +1,292 @@
 import sys
 import os
+import json
+import hashlib
+import resource
+import select
 import subprocess
 import time
-import matplotlib.pyplot as plt
-from math import ceil
+from collections import namedtuple
+from math import ceil, comb
 from convert_data import convert_data
 
-def run_experiments(gspan_exe, fsg_exe, gaston_exe, dataset_path, out_dir):
-    # Convert Data
+THRESHOLDS = [5, 10, 25, 50, 95]
+MARKERS = {'gSpan': 'o', 'FSG': 's', 'Gaston': '^'}
+RESULTS = "results.json"
+INPUT_STAMP = "input.sha1"
+WORK_DIR = "work"
+CONFIDENCE = 0.95
+
+# One miner run: argv (no shell) started in workdir, stdout goes to out_file
+Job = namedtuple("Job", ["miner", "pct", "cmd", "out_file", "quiet_stderr", "workdir"])
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def prepare_inputs(dataset_path, out_dir):
+    """
+    Converts the dataset unless out_dir already holds inputs converted from
+    identical content (same SHA-1, same converter), so repeated benchmark
+    runs do not pay for, or get timed with, the conversion.
+    """
+    converter = os.path.join(os.path.dirname(os.path.abspath(__file__)), "convert_data.py")
+    stamp = f"{file_digest(dataset_path)} {file_digest(converter)}"
+    stamp_path = os.path.join(out_dir, INPUT_STAMP)
+    inputs = [os.path.join(out_dir, f"input_{m}.txt") for m in ("gspan", "fsg", "gaston")]
+
+    if os.path.exists(stamp_path) and all(os.path.exists(p) for p in inputs):
+        with open(stamp_path, 'r') as f:
+            if f.read().strip() == stamp:
+                print(f"Reusing converted inputs in {out_dir} (dataset unchanged)")
+                return
+
+    if os.path.exists(stamp_path):
+        os.remove(stamp_path)
     convert_data(dataset_path, out_dir)
-    
-    gspan_input = os.path.join(out_dir, "input_gspan.txt")
-    fsg_input = os.path.join(out_dir, "input_fsg.txt")
-    gaston_input = os.path.join(out_dir, "input_gaston.txt")
+    with open(stamp_path, 'w') as f:
+        f.write(stamp + "\n")
 
-    # Get total graphs
+def median_ci(values, confidence=CONFIDENCE):
+    """
+    Median of the values with a distribution-free confidence interval: the
+    order statistics x(l), x(u) that bracket the median with probability at
+    least `confidence` (binomial tails). Below 6 samples no pair reaches 95%,
+    so the interval is the full range.
+    """
+    x = sorted(values)
+    n = len(x)
+    med = (x[(n - 1) // 2] + x[n // 2]) / 2
+    lo, hi = 0, n - 1
+    # Widen inwards while the interval still covers the median often enough
+    while lo + 1 < hi - 1:
+        tail = sum(comb(n, i) for i in range(lo + 2)) / 2 ** n
+        if 1 - 2 * tail < confidence:
+            break
+        lo, hi = lo + 1, hi - 1
+    return med, x[lo], x[hi]
+
+def count_graphs(gspan_input):
     total_graphs = 0
     with open(gspan_input, 'r') as f:
         for line in f:
-            if line.startswith("t #") and not line.strip().startswith("t # -1"): 
+            if line.startswith("t #") and not line.strip().startswith("t # -1"):
                 total_graphs += 1
+    return total_graphs
 
-    # Thresholds
-    thresholds = [5, 10, 25, 50, 95]
-    runtimes = {'gSpan': [], 'FSG': [], 'Gaston': []}
+def job_workdir(out_dir, name, input_path):
+    """
+    Private directory of one job, holding a symlink to its input: gSpan -o
+    and FSG write <input>.fp next to the input, so concurrent runs of the
+    same miner must not share the input path. Returns (workdir, link path).
+    """
+    workdir = os.path.abspath(os.path.join(out_dir, WORK_DIR, name))
+    os.makedirs(workdir, exist_ok=True)
+    link = os.path.join(workdir, os.path.basename(input_path))
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.abspath(input_path), link)
+    return workdir, link
 
-    print(f"Total Graphs: {total_graphs}")
+def build_jobs(gspan_exe, fsg_exe, gaston_exe, out_dir, total_graphs, thresholds):
+    gspan_input = os.path.join(out_dir, "input_gspan.txt")
+    fsg_input = os.path.join(out_dir, "input_fsg.txt")
+    gaston_input = os.path.join(out_dir, "input_gaston.txt")
+
+    # Jobs run in their own directories: path-qualified executables must not
+    # depend on the working directory
+    gspan_exe, fsg_exe, gaston_exe = [exe if os.sep not in exe else os.path.abspath(exe)
+                                      for exe in (gspan_exe, fsg_exe, gaston_exe)]
 
+    jobs = []
     for pct in thresholds:
-        print(f"\n--- Running Support {pct}% ---")
-        
-        sup_ratio = pct / 100.0         
-        sup_count = ceil(sup_ratio * total_graphs) 
-        sup_pct = pct                   
-
-        # Run gSpan
-        out_file = os.path.join(out_dir, f"gspan{pct}")
-        
-        cmd = [gspan_exe, "-f", gspan_input, "-s", str(sup_ratio), "-o"]
-        
-        print(f"Running: {' '.join(cmd)}")
-        start = time.time()
-        
-        # capture stdout to file
-        with open(out_file, "w") as outfile:
-            subprocess.run(cmd, stdout=outfile, stderr=subprocess.PIPE)
-            
-        runtimes['gSpan'].append(time.time() - start)
-        print("gSpan finished.")
-
-        # Run FSG
-        out_file = os.path.join(out_dir, f"fsg{pct}")
-        cmd_str = f"{fsg_exe} -s {sup_pct} {fsg_input} > {out_file}"
-        
-        print(f"Running: {cmd_str}")
-        start = time.time()
-        subprocess.run(cmd_str, shell=True)
-        runtimes['FSG'].append(time.time() - start)
-        print("FSG finished.")
-
-        # Run Gaston
-        out_file = os.path.join(out_dir, f"gaston{pct}")
-        cmd_str = f"{gaston_exe} {sup_count} {gaston_input} > {out_file}"
-        
-        print(f"Running: {cmd_str}")
-        start = time.time()
-        subprocess.run(cmd_str, shell=True)
-        runtimes['Gaston'].append(time.time() - start)
-        print("Gaston finished.")
+        sup_ratio = pct / 100.0
+        sup_count = ceil(sup_ratio * total_graphs)
+        sup_pct = pct
+
+        workdir, inp = job_workdir(out_dir, f"gspan{pct}", gspan_input)
+        jobs.append(Job('gSpan', pct, [gspan_exe, "-f", inp, "-s", str(sup_ratio), "-o"],
+                        os.path.join(out_dir, f"gspan{pct}"), True, workdir))
+        workdir, inp = job_workdir(out_dir, f"fsg{pct}", fsg_input)
+        jobs.append(Job('FSG', pct, [fsg_exe, "-s", str(sup_pct), inp],
+                        os.path.join(out_dir, f"fsg{pct}"), False, workdir))
+        workdir, inp = job_workdir(out_dir, f"gaston{pct}", gaston_input)
+        jobs.append(Job('Gaston', pct, [gaston_exe, str(sup_count), inp],
+                        os.path.join(out_dir, f"gaston{pct}"), False, workdir))
+    return jobs
+
+def run_jobs(jobs, max_jobs=1, timeout=None, pin=False):
+    """
+    Runs jobs as child processes, at most max_jobs at a time, started in list order.
+    Jobs running longer than timeout seconds are killed. With pin, every running
+    job gets a CPU of its own (and max_jobs is capped at the CPUs available).
+    Wall time is measured by the driver, which blocks until a job exits (on its
+    pidfd when there are deadlines to watch); user/sys time and peak RSS are
+    the child's own, from os.wait4.
+    Returns one result dict per job, in job order.
+    """
+    free_cpus = sorted(os.sched_getaffinity(0)) if pin else []
+    if pin:
+        max_jobs = min(max_jobs, len(free_cpus))
+    max_jobs = max(1, max_jobs)
+
+    pending = list(enumerate(jobs))[::-1]
+    running = {}  # pid -> [index, proc, stdout file, start, cpu, timed out, pidfd]
+    results = [None] * len(jobs)
+
+    while pending or running:
+        while pending and len(running) < max_jobs:
+            i, job = pending.pop()
+            cpu = free_cpus.pop(0) if pin else None
+            print(f"Running: {' '.join(job.cmd)} > {job.out_file}" + (f"  [cpu {cpu}]" if pin else ""))
+            out = open(job.out_file, "w")
+            pin_fn = (lambda c=cpu: os.sched_setaffinity(0, {c})) if pin else None
+            proc = subprocess.Popen(job.cmd, stdout=out, cwd=job.workdir,
+                                    stderr=subprocess.DEVNULL if job.quiet_stderr else None,
+                                    preexec_fn=pin_fn)
+            pidfd = os.pidfd_open(proc.pid) if timeout is not None else None
+            running[proc.pid] = [i, proc, out, time.perf_counter(), cpu, False, pidfd]
+
+        if timeout is None:
+            pid, status, ru = os.wait4(-1, 0)
+        else:
+            # Sleep until a job exits or the earliest deadline passes
+            deadlines = [e[3] + timeout for e in running.values() if not e[5]]
+            wait_s = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+            ready, _, _ = select.select([e[6] for e in running.values()], [], [], wait_s)
+            if not ready:
+                now = time.perf_counter()
+                for entry in running.values():
+                    if not entry[5] and now - entry[3] >= timeout:
+                        entry[1].kill()
+                        entry[5] = True
+                continue
+            pid = next(p for p, e in running.items() if e[6] == ready[0])
+            pid, status, ru = os.wait4(pid, 0)
+            os.close(running[pid][6])
+
+        end = time.perf_counter()
+        i, proc, out, start, cpu, timed_out, _ = running.pop(pid)
+        wall = end - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.close()
+        if pin:
+            free_cpus.append(cpu)
+
+        job = jobs[i]
+        state = "timeout" if timed_out else ("ok" if proc.returncode == 0 else "failed")
+        results[i] = {
+            "miner": job.miner,
+            "support_pct": job.pct,
+            "cmd": job.cmd,
+            "status": state,
+            "returncode": proc.returncode,
+            "wall_s": round(wall, 4),
+            "user_s": round(ru.ru_utime, 4),
+            "sys_s": round(ru.ru_stime, 4),
+            "max_rss_kb": ru.ru_maxrss,
+            "cpu": cpu,
+        }
+        print(f"{job.miner} @ {job.pct}% {state}: {wall:.3f}s wall, "
+              f"{ru.ru_utime + ru.ru_stime:.3f}s cpu, {ru.ru_maxrss / 1024:.1f} MB peak")
+
+    return results
+
+def summarize(results):
+    """Median wall time and its confidence interval per (miner, support), over the timed ok runs."""
+    runs = {}
+    for r in results:
+        if r["status"] == "ok" and not r["warmup"]:
+            runs.setdefault((r["miner"], r["support_pct"]), []).append(r["wall_s"])
+
+    points = []
+    for (miner, pct), walls in sorted(runs.items()):
+        med, lo, hi = median_ci(walls)
+        points.append({"miner": miner, "support_pct": pct, "runs": len(walls),
+                       "median_s": round(med, 4), "ci_low_s": round(lo, 4), "ci_high_s": round(hi, 4)})
+    return points
+
+def plot_results(results_path, plot_path):
+    """
+    Median runtime vs support per miner, from a results file, with the
+    confidence interval as error bars; failed or timed-out runs are left out.
+    """
+    # Imported here: miners are forked from the driver, and their peak RSS
+    # would otherwise include matplotlib's
+    import matplotlib.pyplot as plt
+
+    with open(results_path, 'r') as f:
+        results = json.load(f)
 
-    # Plotting
     plt.figure()
-    plt.plot(thresholds, runtimes['gSpan'], marker='o', label='gSpan')
-    plt.plot(thresholds, runtimes['FSG'], marker='s', label='FSG')
-    plt.plot(thresholds, runtimes['Gaston'], marker='^', label='Gaston')
+    for miner, marker in MARKERS.items():
+        points = [p for p in results["points"] if p["miner"] == miner]
+        if points:
+            x = [p["support_pct"] for p in points]
+            y = [p["median_s"] for p in points]
+            err = [[p["median_s"] - p["ci_low_s"] for p in points],
+                   [p["ci_high_s"] - p["median_s"] for p in points]]
+            plt.errorbar(x, y, yerr=err, marker=marker, capsize=3, label=miner)
     plt.xlabel('Minimum Support (%)')
     plt.ylabel('Time (s)')
     plt.title('Algorithm Runtime Comparison')
     plt.legend()
     plt.grid(True)
-    plt.savefig(os.path.join(out_dir, "plot.png"))
+    plt.savefig(plot_path)
     print("Plot saved.")
 
+def run_experiments(gspan_exe, fsg_exe, gaston_exe, dataset_path, out_dir,
+                    max_jobs=1, timeout=None, pin=False, warmup=0, repeat=1):
+    # Convert Data (skipped when already converted from the same content)
+    prepare_inputs(dataset_path, out_dir)
+
+    # Get total graphs
+    total_graphs = count_graphs(os.path.join(out_dir, "input_gspan.txt"))
+    print(f"Total Graphs: {total_graphs}")
+
+    base = build_jobs(gspan_exe, fsg_exe, gaston_exe, out_dir, total_graphs, THRESHOLDS)
+
+    # Whole rounds of all jobs, so slow drift of the machine spreads over every
+    # point. Each round finishes before the next starts: warm-ups really come
+    # first, and repeats of one point never compete with each other. Only the
+    # last round writes the real output files; the others get scratch files
+    # (removed below).
+    rounds = warmup + repeat
+    print(f"\n--- Running {rounds * len(base)} jobs ({warmup} warm-up + {repeat} timed rounds), "
+          f"{max_jobs} at a time ---")
+    # A forked child's ru_maxrss starts at the driver's resident size: per-job
+    # peaks at this floor mean the miner itself stayed below it
+    rss_floor = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results = []
+    for rnd in range(rounds):
+        jobs = base if rnd == rounds - 1 else [job._replace(out_file=f"{job.out_file}.run{rnd}")
+                                               for job in base]
+        for r, job in zip(run_jobs(jobs, max_jobs=max_jobs, timeout=timeout, pin=pin), jobs):
+            r["run"] = rnd
+            r["warmup"] = rnd < warmup
+            if rnd < rounds - 1 and os.path.exists(job.out_file):
+                os.remove(job.out_file)
+            results.append(r)
+
+    points = summarize(results)
+    for p in points:
+        print(f"{p['miner']:>6} @ {p['support_pct']:>2}%: median {p['median_s']:.3f}s "
+              f"[{p['ci_low_s']:.3f}, {p['ci_high_s']:.3f}] over {p['runs']} runs")
+
+    results_path = os.path.join(out_dir, RESULTS)
+    with open(results_path, 'w') as f:
+        json.dump({"dataset": dataset_path, "total_graphs": total_graphs, "thresholds": THRESHOLDS,
+                   "max_jobs": max_jobs, "timeout_s": timeout, "pinned": pin,
+                   "warmup": warmup, "repeat": repeat, "confidence": CONFIDENCE, "rss_floor_kb": rss_floor,
+                   "points": points, "jobs": results}, f, indent=1)
+    print(f"Results saved -> {results_path}")
+
+    # Plotting
+    plot_results(results_path, os.path.join(out_dir, "plot.png"))
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
@@ -90,6 +295,18 @@ if __name__ == "__main__":
     parser.add_argument("--gaston", required=True)
     parser.add_argument("--dataset", required=True)
     parser.add_argument("--outdir", required=True)
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="miner runs executed concurrently (default: 1, one after another)")
+    parser.add_argument("--timeout", type=float,
+                        help="kill a miner run after this many seconds")
+    parser.add_argument("--pin", action="store_true",
+                        help="pin every concurrent run to its own CPU")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="untimed rounds of every run before the timed ones")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="timed rounds; each point is the median, with a confidence interval")
     args = parser.parse_args()
-    
-    run_experiments(args.gspan, args.fsg, args.gaston, args.dataset, args.outdir)
\ No newline at end of file
+
+    run_experiments(args.gspan, args.fsg, args.gaston, args.dataset, args.outdir,
+                    max_jobs=args.jobs, timeout=args.timeout, pin=args.pin,
+                    warmup=max(0, args.warmup), repeat=max(1, args.repeat))
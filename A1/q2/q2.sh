@@ -4,7 +4,8 @@ FSG=$2
 GASTON=$3
 DATASET=$4
 OUT_DIR=$5
+# Optional: [--jobs N] [--timeout SECONDS] [--pin] [--warmup W] [--repeat R]
 
 mkdir -p "$OUT_DIR"
 
-python3 driver.py --gspan "$GSPAN" --fsg "$FSG" --gaston "$GASTON" --dataset "$DATASET" --outdir "$OUT_DIR"
\ No newline at end of file
+python3 driver.py --gspan "$GSPAN" --fsg "$FSG" --gaston "$GASTON" --dataset "$DATASET" --outdir "$OUT_DIR" "${@:6}"
\ No newline at end of file
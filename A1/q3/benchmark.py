@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from graph_utils import read_graphs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_stage(name, cmd):
+    """
+    Run one pipeline stage as a child process.
+    Returns wall/user/sys seconds and the child's own peak RSS (os.wait4).
+    """
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=err)
+        _, status, ru = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            err.seek(0)
+            raise RuntimeError(f"stage {name} failed ({proc.returncode}): "
+                               f"{err.read().decode(errors='replace')}")
+
+    print(f"  {name:<28s} {wall:8.3f}s  {ru.ru_maxrss / 1024:8.1f} MB", flush=True)
+    return {
+        "wall_s": round(wall, 4),
+        "user_s": round(ru.ru_utime, 4),
+        "sys_s": round(ru.ru_stime, 4),
+        "max_rss_kb": ru.ru_maxrss,
+    }
+
+
+def candidate_stats(path, n_db):
+    """Pruning power of a q # / c # file: candidate set sizes relative to the database."""
+    sizes = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith("c #"):
+                sizes.append(len(line.split()) - 2)
+    ratios = sorted(s / n_db for s in sizes)
+    return {
+        "queries": len(sizes),
+        "mean_candidate_ratio": round(sum(ratios) / len(ratios), 6) if ratios else None,
+        "median_candidate_ratio": round(ratios[len(ratios) // 2], 6) if ratios else None,
+        "max_candidate_ratio": round(ratios[-1], 6) if ratios else None,
+    }
+
+
+def size_histogram(path):
+    """Histogram of graph sizes (nodes) in power-of-two buckets."""
+    hist = {}
+    for g in read_graphs(path):
+        n = int(g.labels.size)
+        bucket = 1 << max(0, n - 1).bit_length()
+        hist[bucket] = hist.get(bucket, 0) + 1
+    return {f"<={b}": hist[b] for b in sorted(hist)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_one(workdir, n_graphs, args):
+    py = sys.executable
+    db = os.path.join(workdir, f"db_{n_graphs}.txt")
+    qs = os.path.join(workdir, f"q_{n_graphs}.txt")
+    feats = os.path.join(workdir, f"feats_{n_graphs}.txt")
+    db_npy = os.path.join(workdir, f"db_{n_graphs}.npy")
+    q_npy = os.path.join(workdir, f"q_{n_graphs}.npy")
+    cand = os.path.join(workdir, f"cand_{n_graphs}.dat")
+
+    gen = [py, "synth_graphs.py", "--seed", str(args.seed), "--nodes", str(args.nodes),
+           "--nodes-spread", str(args.nodes_spread), "--avg-degree", str(args.avg_degree),
+           "--degree-dist", args.degree_dist, "--node-labels", str(args.node_labels),
+           "--edge-labels", str(args.edge_labels), "--label-skew", str(args.label_skew)]
+    subprocess.run(gen + [db, "--graphs", str(n_graphs)], cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([py, "synth_graphs.py", qs, "--queries-from", db, "--graphs", str(args.queries),
+                    "--nodes", str(args.query_nodes), "--nodes-spread", "2", "--seed", str(args.seed + 1)],
+                   cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+
+    workers = ["--workers", str(args.workers)]
+    stage_cmds = [
+        ("read_graphs", [py, "-c", f"import graph_utils; graph_utils.read_graphs({db!r})"]),
+        ("extract_features", [py, "-c",
+                              "import graph_utils\n"
+                              f"for g in graph_utils.read_graphs({db!r}): graph_utils.extract_features(g)"]),
+        ("identify", [py, "identify.py", db, feats] + workers),
+        ("convert_db", [py, "convert.py", db, feats, db_npy] + workers),
+        ("convert_queries", [py, "convert.py", qs, feats, q_npy] + workers),
+        ("generate_candidates", [py, "generate_candidates.py", db_npy, q_npy, cand]),
+        ("generate_candidates_batched", [py, "generate_candidates.py", db_npy, q_npy, cand,
+                                         "--batched"]),
+    ]
+
+    print(f"N={n_graphs}")
+    stages = {}
+    for name, cmd in stage_cmds:
+        stages[name] = run_stage(name, cmd)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "params": {
+            "graphs": n_graphs, "queries": args.queries, "nodes": args.nodes,
+            "nodes_spread": args.nodes_spread, "avg_degree": args.avg_degree,
+            "degree_dist": args.degree_dist, "node_labels": args.node_labels,
+            "edge_labels": args.edge_labels, "label_skew": args.label_skew,
+            "query_nodes": args.query_nodes, "workers": args.workers, "seed": args.seed,
+        },
+        "graph_sizes": size_histogram(db),
+        "stages": stages,
+        "pruning": candidate_stats(cand, n_graphs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every q3 stage on synthetic databases of growing size; "
+                    "one JSON record per size is appended to --out.")
+    parser.add_argument("--out", default="bench_results.jsonl")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="comma-separated database sizes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-nodes", type=int, default=6)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--nodes-spread", type=int, default=10)
+    parser.add_argument("--avg-degree", type=float, default=2.2)
+    parser.add_argument("--degree-dist", choices=("uniform", "powerlaw"), default="uniform")
+    parser.add_argument("--node-labels", type=int, default=6)
+    parser.add_argument("--edge-labels", type=int, default=3)
+    parser.add_argument("--label-skew", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", metavar="DIR", help="keep generated files in DIR instead of a temp dir")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = os.path.abspath(args.keep or tmp)
+        os.makedirs(workdir, exist_ok=True)
+        for n in sizes:
+            record = bench_one(workdir, n, args)
+            with open(args.out, "a") as out:
+                out.write(json.dumps(record) + "\n")
+
+    print(f"Appended {len(sizes)} records -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from convert import load_features, column_map
+from generate_candidates import build_index, query_candidates
+from graph_utils import build_csr, extract_features, FeatureVocab
+
+HELP = """\
+Requests, one per line (answers use the q # / c # format of generate_candidates.py):
+  f <bits>          query feature vector, K characters of 0/1 (spaces ignored)
+  #                 start a raw query graph, followed by v/e lines and a blank line
+  stats             latency/throughput counters as one JSON line
+  help              this text
+  quit              close this session
+"""
+
+
+class Stats:
+    """Request latency and throughput counters, shared by all sessions."""
+
+    def __init__(self, window=10000):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.latencies = deque(maxlen=window)  # seconds, most recent requests
+
+    def record(self, seconds):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            lat = np.array(self.latencies, dtype=np.float64) * 1000.0
+            uptime = time.perf_counter() - self.started
+            out = {"requests": self.requests, "uptime_s": round(uptime, 3),
+                   "throughput_qps": round(self.requests / uptime, 3) if uptime > 0 else 0.0}
+        if lat.size:
+            out["latency_ms"] = {
+                "mean": round(float(lat.mean()), 4),
+                "p50": round(float(np.percentile(lat, 50)), 4),
+                "p95": round(float(np.percentile(lat, 95)), 4),
+                "p99": round(float(np.percentile(lat, 99)), 4),
+                "max": round(float(lat.max()), 4),
+            }
+        return out
+
+
+class CandidateEngine:
+    """Database index loaded once; answers one query vector or query graph at a time."""
+
+    def __init__(self, db_path, features_path=None):
+        start = time.perf_counter()
+        DB = np.load(db_path, mmap_mode="r")  # (N, K) uint8, paged in while indexing
+        self.N, self.K = DB.shape
+        self.postings, self.support = build_index(DB)
+        del DB
+
+        self.features = None
+        if features_path:
+            self.features = load_features(features_path)
+            if len(self.features) != self.K:
+                raise ValueError(f"{features_path} has {len(self.features)} features, "
+                                 f"the database matrix {self.K} columns")
+            self.vocab = FeatureVocab(self.features)
+            self.column = column_map(self.vocab, self.features)
+        self.startup_s = time.perf_counter() - start
+        self.all_graphs = "c # " + " ".join(map(str, range(1, self.N + 1))) + "\n"
+
+    def featurize(self, g):
+        """Feature row of a CSRGraph, exactly as convert.py would compute it."""
+        row = np.zeros((1, self.K), dtype=np.uint8)
+        cols = self.column[self.vocab.lookup(extract_features(g))]
+        row[0, cols[cols >= 0]] = 1
+        return row
+
+    def answer(self, row):
+        idx = next(query_candidates(self.postings, self.support, row, self.N))
+        if idx is None:
+            return self.all_graphs
+        return "c # " + " ".join(map(str, (idx + 1).tolist())) + "\n"
+
+
+def serve(engine, stats, rfile, wfile):
+    """Line protocol loop over a pair of text streams (see HELP)."""
+    count = 0
+    graph = None  # (node_labels, edges) of the query graph being read
+
+    def reply(row, t0):
+        nonlocal count
+        count += 1
+        text = f"q # {count}\n" + engine.answer(row)
+        wfile.write(text)
+        wfile.flush()
+        stats.record(time.perf_counter() - t0)
+
+    def finish_graph():
+        nonlocal graph
+        t0 = time.perf_counter()
+        node_labels, edges = graph
+        graph = None
+        for u, v, _ in edges:
+            for x in (u, v):
+                if x not in node_labels:
+                    raise ValueError(f"edge {u} {v}: unknown vertex id {x}")
+        reply(engine.featurize(build_csr(node_labels, edges)), t0)
+
+    def error(e):
+        nonlocal graph
+        graph = None
+        wfile.write(f"e # {e}\n")
+        wfile.flush()
+
+    for line in rfile:
+        line = line.strip()
+        try:
+            if graph is not None:
+                parts = line.split()
+                if parts and parts[0] == "v":
+                    graph[0][int(parts[1])] = int(parts[2])
+                    continue
+                if parts and parts[0] == "e":
+                    graph[1].append((int(parts[1]), int(parts[2]), int(parts[3])))
+                    continue
+                # Anything else ends the graph and is then handled normally
+                finish_graph()
+            if not line:
+                continue
+            if line.startswith("#"):
+                if engine.features is None:
+                    raise ValueError("raw query graphs need the server to be started with --features")
+                graph = ({}, [])
+            elif line.startswith("f"):
+                t0 = time.perf_counter()
+                bits = "".join(line[1:].split())
+                if len(bits) != engine.K or set(bits) - {"0", "1"}:
+                    raise ValueError(f"expected {engine.K} bits of 0/1")
+                row = (np.frombuffer(bits.encode("ascii"), dtype=np.uint8) - ord("0")).reshape(1, -1)
+                reply(row, t0)
+            elif line == "stats":
+                wfile.write(json.dumps(stats.snapshot()) + "\n")
+                wfile.flush()
+            elif line == "help":
+                wfile.write(HELP)
+                wfile.flush()
+            elif line == "quit":
+                break
+            else:
+                raise ValueError(f"unknown request {line[:20]!r} (try 'help')")
+        except (ValueError, KeyError, IndexError) as e:
+            error(e)
+
+    # A graph still open at end of input is answered (or rejected) like any other
+    if graph is not None:
+        try:
+            finish_graph()
+        except (ValueError, KeyError, IndexError) as e:
+            error(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python candidate_server.py <db.npy> [--features features_txt] [--socket PATH]",
+        description="Resident candidate generation: index the database once, then answer "
+                    "queries streamed over stdin or a local Unix socket.",
+        epilog=HELP, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_npy")
+    parser.add_argument("--features", help="features file used by convert.py; enables raw query graphs")
+    parser.add_argument("--socket", metavar="PATH", help="listen on this Unix socket instead of stdin/stdout")
+    args = parser.parse_args()
+
+    try:
+        engine = CandidateEngine(args.db_npy, args.features)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = Stats()
+    print(f"Indexed {engine.N} graphs x {engine.K} features in {engine.startup_s:.3f}s", file=sys.stderr)
+
+    if args.socket is None:
+        serve(engine, stats, sys.stdin, sys.stdout)
+        print(json.dumps(stats.snapshot()), file=sys.stderr)
+        return
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            with self.request.makefile("r") as rfile, self.request.makefile("w") as wfile:
+                serve(engine, stats, rfile, wfile)
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    with socketserver.ThreadingUnixStreamServer(args.socket, Handler) as server:
+        print(f"Listening on {args.socket}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+            print(json.dumps(stats.snapshot()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+#!/bin/bash
+set -euo pipefail
+
+# Usage:
+# bash candidate_server.sh <path_database_graph_features> [--features <path_discriminative_subgraphs>] [--socket PATH]
+DB_NPY="$1"
+
+python3 candidate_server.py "$DB_NPY" "${@:2}"
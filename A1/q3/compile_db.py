@@ -0,0 +1,16 @@
+import argparse
+import time
+from graph_utils import compile_graphs
+
+def main():
+    parser = argparse.ArgumentParser(usage="python compile_db.py <graphs_txt> <out_npz>")
+    parser.add_argument("graphs_txt")
+    parser.add_argument("out_npz", help="binary graph store, accepted anywhere a graph file is")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    m = compile_graphs(args.graphs_txt, args.out_npz)
+    print(f"Compiled {m} graphs into {args.out_npz} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+#!/bin/bash
+set -euo pipefail
+
+# Usage:
+# bash compile_db.sh <path_graphs> <path_graph_store.npz>
+# The store can then replace <path_graphs> in identify.sh, convert.sh and verify.sh
+GRAPHS="$1"
+OUT_NPZ="$2"
+
+python3 compile_db.py "$GRAPHS" "$OUT_NPZ"
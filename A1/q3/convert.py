@@ -1,6 +1,9 @@
-import sys
+import argparse
 import numpy as np
-from graph_utils import read_graphs, extract_features
+from graph_utils import (read_graphs, iter_graphs, count_graphs, extract_all_features, parse_feature,
+                         FeatureVocab)
+from feature_cache import cached_features
+from profiling import PROFILE
 
 def load_features(path):
     feats = []
@@ -9,40 +12,91 @@ def load_features(path):
             line = line.strip()
             if not line:
                 continue
-            parts = line.split()
-            # First token is feature type 'E'/'P'/'T'
-            t = parts[0]
-            rest = list(map(int, parts[1:]))
-            feats.append(tuple([t] + rest))
+            feats.append(parse_feature(line))
     return feats
 
+def column_map(vocab, features):
+    """
+    Interned feature id -> column of the feature matrix (-1: not selected).
+    Only the selected features are looked up; ones vocab has never seen
+    match no graph and are left out.
+    """
+    column = np.full(len(vocab), -1, dtype=np.int64)
+    for j, f in enumerate(features):
+        fid = vocab.ids.get(f)
+        if fid is not None:
+            column[fid] = j
+    return column
+
 def main():
-    if len(sys.argv) != 4:
-        print("Usage: python convert.py <graphs> <features_txt> <out_npy>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        usage="python convert.py <graphs> <features_txt> <out_npy> [--workers N] [--cache DIR] [--out-of-core]"
+              " [--profile PATH]")
+    parser.add_argument("graphs")
+    parser.add_argument("features_txt")
+    parser.add_argument("out_npy")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for feature extraction (default: 1, serial)")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse per-graph features extracted by earlier runs on the same file")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="stream graphs from disk and write rows straight into a memory-mapped "
+                             "out_npy instead of building the matrix in RAM")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="append a JSON record of stage timings, feature enumeration costs, "
+                             "graph sizes and peak memory to PATH (env: Q3_PROFILE)")
+    args = parser.parse_args()
+    PROFILE.start("convert", args.profile)
 
-    graphs_path = sys.argv[1]
-    feats_path = sys.argv[2]
-    out_npy = sys.argv[3]
+    graphs_path = args.graphs
+    feats_path = args.features_txt
+    out_npy = args.out_npy
 
-    features = load_features(feats_path)
+    with PROFILE.stage("load_features"):
+        features = load_features(feats_path)
     k = len(features)
 
-    graphs = read_graphs(graphs_path)
-    m = len(graphs)
+    # Feature ids of every graph, either from the cache or freshly extracted
+    if args.cache:
+        with PROFILE.stage("cached_features"):
+            vocab, _, per_graph_ids = cached_features(graphs_path, args.cache, workers=args.workers)
+        m = len(per_graph_ids)
+    else:
+        # Features outside the selection never reach a column, so they need no id
+        vocab = FeatureVocab(features)
+        if args.out_of_core:
+            # Count first so the output can be sized, then parse one graph at a time
+            m = count_graphs(graphs_path)
+            graphs = iter_graphs(graphs_path)
+        else:
+            with PROFILE.stage("read_graphs"):
+                graphs = read_graphs(graphs_path)
+            m = len(graphs)
+        per_graph_ids = (vocab.lookup(gfeats)
+                         for gfeats in extract_all_features(graphs, workers=args.workers))
+
+    column = column_map(vocab, features)
 
-    X = np.zeros((m, k), dtype=np.uint8)
+    if args.out_of_core:
+        # Rows go to the page cache as they are filled; the file is the .npy itself
+        X = np.lib.format.open_memmap(out_npy, mode="w+", dtype=np.uint8, shape=(m, k))
+    else:
+        X = np.zeros((m, k), dtype=np.uint8)
 
-    # Precompute for each graph: its feature set
-    for i, (nl, adj) in enumerate(graphs):
-        gfeats = extract_features(nl, adj)
-        # Fill vector
-        for j, f in enumerate(features):
-            if f in gfeats:
-                X[i, j] = 1
+    # Scatter only the features each graph actually has (extraction, and with
+    # --out-of-core parsing, happen lazily inside this stage)
+    with PROFILE.stage("fill_rows"):
+        for i, ids in enumerate(per_graph_ids):
+            cols = column[ids]
+            X[i, cols[cols >= 0]] = 1
 
-    np.save(out_npy, X)
+    with PROFILE.stage("save"):
+        if args.out_of_core:
+            X.flush()
+        else:
+            np.save(out_npy, X)
     print(f"Saved features: shape={X.shape} -> {out_npy}")
+    PROFILE.finish(n_graphs=m, n_features=k)
 
 if __name__ == "__main__":
     main()
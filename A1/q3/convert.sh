@@ -2,9 +2,9 @@
 set -euo pipefail
 
 # Usage:
-# bash convert.sh <path_graphs> <path_discriminative_subgraphs> <path_features>
+# bash convert.sh <path_graphs> <path_discriminative_subgraphs> <path_features> [--workers N] [--cache DIR] [--out-of-core] [--profile PATH]
 GRAPHS="$1"
 FEATURES="$2"
 OUT_NPY="$3"
 
-python3 convert.py "$GRAPHS" "$FEATURES" "$OUT_NPY"
+python3 convert.py "$GRAPHS" "$FEATURES" "$OUT_NPY" "${@:4}"
@@ -0,0 +1,98 @@
+import fcntl
+import hashlib
+import os
+import numpy as np
+import graph_utils
+from graph_utils import read_graphs, graph_signatures, extract_all_features, FeatureVocab
+
+# Cached entries are only valid for the feature definitions that produced them,
+# so the cache is namespaced by a digest of graph_utils itself.
+with open(graph_utils.__file__, "rb") as _f:
+    EXTRACTOR_VERSION = hashlib.sha1(_f.read()).hexdigest()[:16]
+
+
+def file_digest(path, block=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def _replace_atomically(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _load_vocab(path):
+    return FeatureVocab.load(path) if os.path.exists(path) else FeatureVocab()
+
+
+def cached_features(graphs_path, cache_dir, workers=1, dedup="labels"):
+    """
+    Feature ids of every graph in graphs_path, computed once per file content.
+    Layout of cache_dir/<EXTRACTOR_VERSION>/:
+      vocab.txt          FeatureVocab shared by all entries (append-only)
+      vocab.lock         serializes vocabulary updates between processes
+      <file sha1>.npz    per-graph dedup signatures (every mode in DEDUP_MODES)
+                         plus feature ids (CSR packed)
+    Returns (vocab, signatures, feat_ids):
+      vocab:      FeatureVocab the ids refer to
+      signatures: graph_signatures(graphs, dedup), one per graph
+      feat_ids:   list of int32 arrays, one per graph
+    """
+    root = os.path.join(cache_dir, EXTRACTOR_VERSION)
+    os.makedirs(root, exist_ok=True)
+
+    vocab_file = os.path.join(root, "vocab.txt")
+
+    entry = os.path.join(root, file_digest(graphs_path) + ".npz")
+    if os.path.exists(entry):
+        # Saved vocabularies only grow, so an entry's ids are always in range
+        vocab = _load_vocab(vocab_file)
+        with np.load(entry) as z:
+            offsets, ids, sigs = z["offsets"], z["ids"], z[f"{dedup}_signatures"]
+        if ids.size and int(ids.max()) >= len(vocab):
+            raise RuntimeError(f"feature cache {root}: {os.path.basename(entry)} refers to ids beyond "
+                               f"vocab.txt ({len(vocab)} features); delete the cache directory")
+        feat_ids = [ids[offsets[i]:offsets[i + 1]] for i in range(len(sigs))]
+        if sigs.dtype.kind == "S":
+            return vocab, [s.decode("ascii") for s in sigs.tolist()], feat_ids
+        return vocab, sigs.tolist(), feat_ids
+
+    # Extract against a private vocabulary: other runs may extend the shared
+    # one meanwhile
+    graphs = read_graphs(graphs_path)
+    label_sigs = graph_signatures(graphs, "labels")
+    wl_sigs = graph_signatures(graphs, "wl")
+    local = FeatureVocab()
+    local_ids = [np.array(local.intern_all(feats), dtype=np.int32)
+                 for feats in extract_all_features(graphs, workers=workers)]
+
+    with open(os.path.join(root, "vocab.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        # Re-read under the lock, then map the private ids onto it
+        vocab = _load_vocab(vocab_file)
+        remap = np.array(vocab.intern_all(local.feats), dtype=np.int32)
+        feat_ids = [remap[a] for a in local_ids]
+
+        offsets = np.zeros(len(feat_ids) + 1, dtype=np.int64)
+        np.cumsum([a.size for a in feat_ids], out=offsets[1:])
+        ids = np.concatenate(feat_ids) if feat_ids else np.zeros(0, dtype=np.int32)
+
+        def save_entry(tmp):
+            with open(tmp, "wb") as f:
+                np.savez(f, offsets=offsets, ids=ids,
+                         labels_signatures=np.array(label_sigs, dtype="S"),
+                         wl_signatures=np.array(wl_sigs, dtype=np.uint64))
+
+        # The vocabulary only grows, so entries written earlier stay valid
+        _replace_atomically(vocab_file, vocab.save)
+        _replace_atomically(entry, save_entry)
+
+    return vocab, (wl_sigs if dedup == "wl" else label_sigs), feat_ids
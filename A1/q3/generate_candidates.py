@@ -1,67 +1,183 @@
-import sys
+import argparse
 import numpy as np
+from profiling import PROFILE
+
+# Rows are packed 8 per byte; blocks are a multiple of 64 rows so every block
+# lands on whole uint64 words of the posting bitsets.
+INDEX_BLOCK_ROWS = 1 << 16
+
+# Tuning knobs (keep small & simple)
+ALPHA = 0.5   # enforce ~50% of query's active features (rarest ones)
+TMAX  = 6     # never require more than this many features
+
+
+def build_index(DB):
+    """
+    Build the inverted index of a (N, K) 0/1 feature matrix.
+    Returns (postings, support):
+      postings: (K, W) uint64, bit i of row j set iff graph i has feature j
+                (np.packbits bit order, padded with zeros to whole words)
+      support:  (K,) number of graphs containing each feature
+    """
+    N, K = DB.shape
+    W = (N + 63) // 64
+    packed = np.zeros((K, W * 8), dtype=np.uint8)
+    support = np.zeros(K, dtype=np.uint64)
+
+    # Pack in row blocks so we never materialize a full transposed copy
+    for s in range(0, N, INDEX_BLOCK_ROWS):
+        block = DB[s:s + INDEX_BLOCK_ROWS]
+        support += block.sum(axis=0, dtype=np.uint64)
+        bits = np.packbits(block == 1, axis=0)  # (ceil(rows/8), K)
+        packed[:, s // 8:s // 8 + bits.shape[0]] = bits.T
+
+    return packed.view(np.uint64), support
+
+
+def postings_to_ids(words, N):
+    """0-based ids of the set bits in a (W,) uint64 bitset."""
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8))[:N])
+
+
+def enforced_count(n_active):
+    """Number of rarest features to enforce first, given the query's active count."""
+    t0 = np.floor(ALPHA * n_active).astype(np.int64)
+    t0 = np.maximum(1, t0)
+    return np.minimum(np.minimum(t0, TMAX), n_active)
+
+
+def query_candidates(postings, support, Q, N):
+    """
+    Per-query filtering. Yields, for each row of Q, the 0-based candidate ids,
+    or None when the query cannot be pruned (every graph is a candidate).
+    Ties in support are broken by feature index.
+    """
+    for vq in Q:
+        active = np.flatnonzero(vq == 1)
+
+        # If no features in query: cannot prune
+        if active.size == 0:
+            yield None
+            continue
+
+        # Pick rarest query-features first
+        active_sorted = active[np.argsort(support[active], kind="stable")]
+
+        # Start with a moderate number of enforced features
+        t0 = int(enforced_count(active_sorted.size))
+
+        # Backoff: we want the largest t <= t0 whose rarest-t AND is
+        # non-empty. Prefix ANDs only shrink, so grow t from 1 and stop
+        # at the first empty intersection instead of rescanning per t.
+        acc = None
+        for t in range(1, t0 + 1):
+            nxt = postings[active_sorted[t - 1]]
+            nxt = nxt.copy() if acc is None else np.bitwise_and(acc, nxt)
+            if not nxt.any():
+                break
+            acc = nxt
+
+        # If still empty, fallback to all graphs (never output empty)
+        yield None if acc is None else postings_to_ids(acc, N)
+
+
+def batched_candidates(postings, support, Q, N, block_size):
+    """
+    Same result as query_candidates, computed for `block_size` queries at a time.
+    Peak extra memory is about block_size * (TMAX + 8) * N / 8 bytes.
+    """
+    K = support.size
+    if K == 0:
+        yield from (None for _ in range(Q.shape[0]))
+        return
+
+    # Global rarity order; a stable sort makes it agree with the per-query
+    # ordering of any subset of features
+    rank = np.argsort(support, kind="stable")
+    cols = np.arange(TMAX)
+
+    for s in range(0, Q.shape[0], block_size):
+        # Active features of each query, columns permuted into rarity order
+        A = Q[s:s + block_size][:, rank] == 1
+        B = A.shape[0]
+        cum = np.cumsum(A, axis=1, dtype=np.int64)
+        n_active = cum[:, -1]
+        t0 = enforced_count(n_active)
+
+        # Feature id of the j-th rarest active feature (j < TMAX) per query;
+        # slots at or beyond t0 are filled with feature 0 and masked out below
+        must = np.zeros((B, TMAX), dtype=np.int64)
+        for j in range(TMAX):
+            has = n_active > j
+            pos = np.argmax(cum > j, axis=1)
+            must[has, j] = rank[pos[has]]
+
+        # Prefix ANDs of the rarest-t posting bitsets for t = 1..TMAX
+        prefix = np.bitwise_and.accumulate(postings[must], axis=1)  # (B, TMAX, W)
+        nonempty = prefix.any(axis=2) & (cols[None, :] < t0[:, None])
+
+        # Prefix ANDs only shrink, so the backoff picks the count of non-empty ones
+        t_star = nonempty.sum(axis=1)
+
+        chosen = prefix[np.arange(B), np.maximum(t_star - 1, 0)]  # (B, W)
+        bits = np.unpackbits(chosen.view(np.uint8), axis=1)[:, :N]
+        for b in range(B):
+            yield None if t_star[b] == 0 else np.flatnonzero(bits[b])
+
 
 def main():
-    if len(sys.argv) != 4:
-        print("Usage: python3 generate_candidates.py <db.npy> <q.npy> <out_candidates.dat>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        usage="python3 generate_candidates.py <db.npy> <q.npy> <out_candidates.dat> [--batched] [--block-size B]"
+              " [--profile PATH]")
+    parser.add_argument("db_npy")
+    parser.add_argument("q_npy")
+    parser.add_argument("out_candidates")
+    parser.add_argument("--batched", action="store_true",
+                        help="filter whole blocks of queries at once instead of one at a time")
+    parser.add_argument("--block-size", type=int, default=64,
+                        help="queries per block in --batched mode (bounds peak memory)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="append a JSON record of stage timings and peak memory to PATH (env: Q3_PROFILE)")
+    args = parser.parse_args()
+    PROFILE.start("generate_candidates", args.profile)
 
-    db_path = sys.argv[1]
-    q_path = sys.argv[2]
-    out_path = sys.argv[3]
+    db_path = args.db_npy
+    q_path = args.q_npy
+    out_path = args.out_candidates
 
-    DB = np.load(db_path)  # (N, K) uint8
-    Q  = np.load(q_path)   # (M, K) uint8
+    # Memory-mapped: build_index reads the database INDEX_BLOCK_ROWS rows at a
+    # time and queries are read block by block, so neither is loaded whole
+    DB = np.load(db_path, mmap_mode="r")  # (N, K) uint8
+    Q  = np.load(q_path, mmap_mode="r")   # (M, K) uint8
 
     N, K = DB.shape
     M, K2 = Q.shape
     assert K == K2
 
-    # Support of each feature in the database (how common it is)
-    support = DB.sum(axis=0)  # shape (K,)
+    # Per-feature posting bitsets + support of each feature in the database
+    # (how common it is). The dense matrix is no longer needed after this.
+    with PROFILE.stage("build_index"):
+        postings, support = build_index(DB)
+    del DB
 
-    # Tuning knobs (keep small & simple)
-    ALPHA = 0.5   # enforce ~50% of query's active features (rarest ones)
-    TMAX  = 6     # never require more than this many features
+    if args.batched:
+        results = batched_candidates(postings, support, Q, N, max(1, args.block_size))
+    else:
+        results = query_candidates(postings, support, Q, N)
 
-    with open(out_path, "w") as out:
-        for qi in range(M):
-            vq = Q[qi]
-            active = np.flatnonzero(vq == 1)
-
-            # If no features in query: cannot prune
-            if active.size == 0:
-                candidates = list(range(1, N + 1))
-            else:
-                # Pick rarest query-features first
-                active_sorted = active[np.argsort(support[active])]
-
-                # Start with a moderate number of enforced features
-                t0 = int(np.floor(ALPHA * active_sorted.size))
-                t0 = max(1, t0)
-                t0 = min(t0, TMAX, active_sorted.size)
-
-                candidates_idx = None
-
-                # Backoff loop: if too strict -> reduce t until non-empty
-                for t in range(t0, 0, -1):
-                    must = active_sorted[:t]
-                    ok = (DB[:, must] == 1).all(axis=1)
-                    idx = np.nonzero(ok)[0]
-                    if idx.size > 0:
-                        candidates_idx = idx
-                        break
-
-                # If still empty, fallback to all graphs (never output empty)
-                if candidates_idx is None:
-                    candidates = list(range(1, N + 1))
-                else:
-                    candidates = (candidates_idx + 1).tolist()  # 1-indexed
+    all_graphs = "c # " + " ".join(map(str, range(1, N + 1))) + "\n"
 
+    # Queries are filtered lazily, as their lines are written
+    with PROFILE.stage("query_and_write"), open(out_path, "w") as out:
+        for qi, candidates_idx in enumerate(results):
             out.write(f"q # {qi+1}\n")
-            out.write("c # " + " ".join(map(str, candidates)) + "\n")
+            if candidates_idx is None:
+                out.write(all_graphs)
+            else:
+                out.write("c # " + " ".join(map(str, (candidates_idx + 1).tolist())) + "\n")  # 1-indexed
 
     print(f"Wrote candidates -> {out_path}")
+    PROFILE.finish(n_db_graphs=N, n_queries=M, n_features=K)
 
 if __name__ == "__main__":
     main()
@@ -1,28 +1,79 @@
 import hashlib
-from collections import defaultdict
+import itertools
+import os
+import struct
+import zipfile
+from collections import deque, namedtuple
+from multiprocessing import Pool
 
+import numpy as np
 
-def read_graphs(path):
+from profiling import PROFILE, reset_worker
+
+
+# Compact per-graph storage. Nodes are renumbered 0..n-1 in increasing id
+# order; every undirected edge is stored in both directions:
+#   labels:  (n,) node labels
+#   offsets: (n+1,) CSR row pointers, neighbors of u are offsets[u]:offsets[u+1]
+#   nbrs:    (2m,) neighbor node indices
+#   elabels: (2m,) edge label of each neighbor entry
+CSRGraph = namedtuple("CSRGraph", ["labels", "offsets", "nbrs", "elabels"])
+
+
+def build_csr(node_labels, edges):
+    """
+    Build a CSRGraph from a {node_id: label} dict and a list of (u, v, edge_label).
+    Each node's neighbor entries keep the order in which its edges were listed.
+    """
+    # Renumbering must preserve id order: feature extraction breaks ties
+    # between parallel edges by comparing node ids
+    ids = sorted(node_labels)
+    index = {vid: i for i, vid in enumerate(ids)}
+    n = len(index)
+
+    deg = [0] * (n + 1)
+    for u, v, _ in edges:
+        deg[index[u] + 1] += 1
+        deg[index[v] + 1] += 1
+    for i in range(n):
+        deg[i + 1] += deg[i]
+
+    pos = deg[:-1]
+    nbrs = [0] * deg[n]
+    elabels = [0] * deg[n]
+    for u, v, el in edges:
+        iu, iv = index[u], index[v]
+        # Treat as undirected for feature extraction
+        nbrs[pos[iu]] = iv
+        elabels[pos[iu]] = el
+        pos[iu] += 1
+        nbrs[pos[iv]] = iu
+        elabels[pos[iv]] = el
+        pos[iv] += 1
+
+    return CSRGraph(
+        np.array([node_labels[vid] for vid in ids], dtype=np.int32),
+        np.array(deg, dtype=np.int32),
+        np.array(nbrs, dtype=np.int32),
+        np.array(elabels, dtype=np.int32),
+    )
+
+
+def iter_graphs(path):
     """
     Reads graphs in the assignment format:
       #                (new graph marker)
       v <id> <label>
       e <u> <v> <edge_label>
-    Returns a list of (node_labels, adj) pairs.
-      node_labels: dict[int -> int]
-      adj: defaultdict(list) where adj[u] = list of (v, edge_label)
+    or a binary store written by compile_graphs (detected from the file).
+    Yields one CSRGraph at a time, so only the current graph is held in memory.
     """
-    graphs = []
-    node_labels = None
-    adj = None
+    if is_graph_store(path):
+        yield from GraphStore(path)
+        return
 
-    def flush():
-        nonlocal node_labels, adj
-        if node_labels is None:
-            return
-        graphs.append((node_labels, adj))
-        node_labels = None
-        adj = None
+    node_labels = None
+    edges = None
 
     with open(path, "r") as f:
         for line in f:
@@ -31,9 +82,10 @@ def read_graphs(path):
                 continue
 
             if line.startswith("#"):
-                flush()
+                if node_labels is not None:
+                    yield build_csr(node_labels, edges)
                 node_labels = {}
-                adj = defaultdict(list)
+                edges = []
                 continue
 
             parts = line.split()
@@ -45,32 +97,184 @@ def read_graphs(path):
                 u = int(parts[1])
                 v = int(parts[2])
                 el = int(parts[3])
-                # Treat as undirected for feature extraction
-                adj[u].append((v, el))
-                adj[v].append((u, el))
+                edges.append((u, v, el))
+
+    if node_labels is not None:
+        yield build_csr(node_labels, edges)
+
+
+def read_graphs(path):
+    """
+    Reads every graph of a file (see iter_graphs). Returns a list of CSRGraph,
+    or for a binary store the memory-mapped GraphStore sequence.
+    """
+    if is_graph_store(path):
+        return GraphStore(path)
+    return list(iter_graphs(path))
+
+
+def take(graphs, idx):
+    """[graphs[i] for i in idx], keeping a GraphStore a (memory-mapped) store."""
+    if isinstance(graphs, GraphStore):
+        return graphs.take(idx)
+    return [graphs[i] for i in idx]
+
+
+def count_graphs(path):
+    """Number of graphs in a file, from its "#" markers, without parsing them."""
+    if is_graph_store(path):
+        return len(load_graph_store(path)["graph_nodes"]) - 1
+    with open(path, "r") as f:
+        return sum(1 for line in f if line.lstrip().startswith("#"))
+
+
+# Binary graph store: an uncompressed .npz of every graph's CSR arrays laid
+# end to end, so it can be memory-mapped instead of parsed:
+#   graph_nodes:   (m+1,) graph g owns nodes graph_nodes[g]:graph_nodes[g+1]
+#   graph_entries: (m+1,) and neighbor entries graph_entries[g]:graph_entries[g+1]
+#   labels:        node labels of all graphs
+#   offsets:       each graph's (n+1,) CSR row pointers, local to the graph
+#   nbrs, elabels: neighbor entries of all graphs (local node indices)
+STORE_ARRAYS = ("graph_nodes", "graph_entries", "labels", "offsets", "nbrs", "elabels")
+
+
+def is_graph_store(path):
+    """True if path is a compiled graph store (a zip file) rather than text."""
+    with open(path, "rb") as f:
+        return f.read(4) == b"PK\x03\x04"
+
+
+def compile_graphs(src, out_path):
+    """Parse the text graph file src once and write it as a binary store. Returns the graph count."""
+    parts = {name: [] for name in STORE_ARRAYS[2:]}
+    sizes = [[0], [0]]
+    for g in iter_graphs(src):
+        for name in parts:
+            parts[name].append(getattr(g, name))
+        sizes[0].append(g.labels.size)
+        sizes[1].append(g.nbrs.size)
+
+    arrays = {"graph_nodes": np.cumsum(sizes[0], dtype=np.int64),
+              "graph_entries": np.cumsum(sizes[1], dtype=np.int64)}
+    for name, chunks in parts.items():
+        arrays[name] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
 
-    flush()
-    return graphs
+    # Written under a temporary name so readers never see a partial store
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, out_path)
+    return len(sizes[0]) - 1
 
 
-def graph_signature(node_labels, adj):
+def load_graph_store(path):
+    """
+    Memory-maps every array of a graph store: {name: read-only array}.
+    np.load cannot map .npz members, but savez stores them uncompressed, so
+    each member's .npy data is mapped in place at its offset in the zip.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as z, open(path, "rb") as f:
+        for info in z.infolist():
+            # Local file header: 30 bytes, then the name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len(".npy")]
+            if info.compress_type != zipfile.ZIP_STORED or fortran:
+                raise ValueError(f"{path}: member {name} cannot be memory-mapped")
+            if not np.prod(shape):
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(),
+                                         shape=shape).view(np.ndarray)
+    return arrays
+
+
+# Stores already mapped by this process, by path (pool workers map each once)
+_STORES = {}
+
+
+def _open_store(path, ids):
+    arrays = _STORES.get(path)
+    if arrays is None:
+        arrays = _STORES[path] = load_graph_store(path)
+    return GraphStore(path, ids, arrays)
+
+
+class GraphStore:
+    """
+    Sequence of CSRGraph views into a memory-mapped graph store, optionally
+    restricted to some of its graphs (ids, in store order or not).
+    Pickles as (path, ids): a worker process maps the file itself instead of
+    receiving copies of the graphs.
+    """
+
+    def __init__(self, path, ids=None, arrays=None):
+        self.path = path
+        a = load_graph_store(path) if arrays is None else arrays
+        self.arrays = a
+        self.labels, self.offsets, self.nbrs, self.elabels = a["labels"], a["offsets"], a["nbrs"], a["elabels"]
+        self.nodes = a["graph_nodes"]
+        self.entries = a["graph_entries"]
+        self.ids = range(len(self.nodes) - 1) if ids is None else ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return GraphStore(self.path, self.ids[i], self.arrays)
+        return self.graph(int(self.ids[i]))
+
+    def __iter__(self):
+        for g in self.ids:
+            yield self.graph(int(g))
+
+    def __reduce__(self):
+        return _open_store, (self.path, self.ids)
+
+    def graph(self, g):
+        """CSRGraph of graph g of the store (ignoring the restriction)."""
+        n0, n1 = int(self.nodes[g]), int(self.nodes[g + 1])
+        e0, e1 = int(self.entries[g]), int(self.entries[g + 1])
+        return CSRGraph(self.labels[n0:n1], self.offsets[n0 + g:n1 + g + 1],
+                        self.nbrs[e0:e1], self.elabels[e0:e1])
+
+    def take(self, idx):
+        """The graphs at positions idx of this sequence, as a GraphStore."""
+        return GraphStore(self.path, np.asarray(self.ids, dtype=np.int64)[np.asarray(idx, dtype=np.int64)],
+                          self.arrays)
+
+
+def graph_signature(g):
     """
     Cheap canonical-ish signature for dedup:
     - multiset of node labels
     - multiset of edge triples (min(uLabel,vLabel), eLabel, max(uLabel,vLabel))
     """
-    nl = sorted(node_labels.values())
+    labels = g.labels.tolist()
+    offsets = g.offsets.tolist()
+    nbrs = g.nbrs.tolist()
+    elabels = g.elabels.tolist()
+
+    nl = sorted(labels)
 
     edges = []
     seen = set()
-    for u, nbrs in adj.items():
-        for v, el in nbrs:
+    for u in range(len(labels)):
+        for i in range(offsets[u], offsets[u + 1]):
+            v, el = nbrs[i], elabels[i]
             a, b = (u, v) if u < v else (v, u)
             key = (a, b, el)
             if key in seen:
                 continue
             seen.add(key)
-            lu, lv = node_labels[u], node_labels[v]
+            lu, lv = labels[u], labels[v]
             x, y = (lu, lv) if lu <= lv else (lv, lu)
             edges.append((x, el, y))
 
@@ -79,126 +283,349 @@ def graph_signature(node_labels, adj):
     return hashlib.sha1(repr(data).encode("utf-8")).hexdigest()
 
 
-def extract_features(node_labels, adj):
+# splitmix64 finalizer constants
+_MIX_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_M2 = np.uint64(0x94D049BB133111EB)
+_SALT_NODE = np.uint64(0x9E3779B97F4A7C15)
+_SALT_EDGE = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def _mix64(x):
+    """Elementwise 64-bit avalanche hash of a uint64 array (wraps mod 2**64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _MIX_M1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _MIX_M2
+    return x ^ (x >> np.uint64(31))
+
+
+def _segment_sums(values, bounds):
+    """Sums (mod 2**64) of values[bounds[i]:bounds[i+1]] for every i."""
+    cs = np.zeros(values.size + 1, dtype=np.uint64)
+    np.cumsum(values, out=cs[1:])
+    return cs[bounds[1:]] - cs[bounds[:-1]]
+
+
+def wl_signatures(graphs, rounds=3):
     """
-    Extract small monotone graph fragments (features) present in the graph.
+    Structural dedup signature: Weisfeiler-Lehman label refinement over node
+    and edge labels, hashed to 64 bits with splitmix64.
+    Unlike graph_signature it sees how labels are connected, so graphs with
+    equal label/edge multisets but different structure get different hashes.
+    All graphs are refined together as one disjoint union.
+    Returns: (len(graphs),) uint64 array.
+    """
+    if not graphs:
+        return np.zeros(0, dtype=np.uint64)
+
+    n_nodes = np.array([g.labels.size for g in graphs], dtype=np.int64)
+    n_entries = np.array([g.nbrs.size for g in graphs], dtype=np.int64)
+    node_bounds = np.zeros(len(graphs) + 1, dtype=np.int64)
+    np.cumsum(n_nodes, out=node_bounds[1:])
+
+    # Disjoint union in CSR form: neighbor ids shifted to global node ids
+    labels = np.concatenate([g.labels for g in graphs]).astype(np.uint64)
+    nbrs = np.concatenate([g.nbrs for g in graphs]).astype(np.int64)
+    nbrs += np.repeat(node_bounds[:-1], n_entries)
+    degrees = np.concatenate([np.diff(g.offsets) for g in graphs])
+    entry_bounds = np.zeros(labels.size + 1, dtype=np.int64)
+    np.cumsum(degrees, out=entry_bounds[1:])
+
+    edge_keys = _mix64(np.concatenate([g.elabels for g in graphs]).astype(np.uint64) + _SALT_EDGE)
+    colors = _mix64(labels + _SALT_NODE)
+
+    for _ in range(rounds):
+        # Multiset of (neighbor color, edge label), combined order-independently
+        msgs = _mix64(colors[nbrs] ^ edge_keys)
+        colors = _mix64(colors * _SALT_NODE + _segment_sums(msgs, entry_bounds))
+
+    sig = _segment_sums(_mix64(colors), node_bounds)
+    return _mix64(sig ^ _mix64(n_nodes.astype(np.uint64) * _SALT_NODE + n_entries.astype(np.uint64)))
+
+
+DEDUP_MODES = ("labels", "wl")
+
+
+def graph_signatures(graphs, mode="labels"):
+    """
+    Dedup signatures of a list of CSRGraph:
+      "labels": graph_signature (label and edge-triple multisets, SHA-1)
+      "wl":     wl_signatures (structural, 64-bit)
+    """
+    if mode == "labels":
+        return [graph_signature(g) for g in graphs]
+    if mode == "wl":
+        return wl_signatures(graphs).tolist()
+    raise ValueError(f"unknown dedup mode {mode!r}, expected one of {DEDUP_MODES}")
+
+
+_PERMS3 = list(itertools.permutations(range(3)))
+
+# Canonical triangle feature per (la, lb, lc, eab, ebc, eca), filled on first use
+_TRI_CANON = {}
+
+
+def _canon_triangle(la, lb, lc, eab, ebc, eca):
+    """
+    Smallest ("T", l1, l2, l3, e12, e23, e31) over all vertex orderings.
+    Labels come first in the tuple, so only orderings that sort the labels
+    can win; edge labels just break ties between equally labelled vertices.
+    """
+    key = (la, lb, lc, eab, ebc, eca)
+    rep = _TRI_CANON.get(key)
+    if rep is None:
+        L = (la, lb, lc)
+        E = {(0, 1): eab, (1, 0): eab, (1, 2): ebc, (2, 1): ebc, (2, 0): eca, (0, 2): eca}
+        sorted_labels = tuple(sorted(L))
+        rep = min(("T", L[p], L[q], L[r], E[(p, q)], E[(q, r)], E[(r, p)])
+                  for p, q, r in _PERMS3 if (L[p], L[q], L[r]) == sorted_labels)
+        _TRI_CANON[key] = rep
+    return rep
+
+
+def _keys_excluding(key_counts, lx, els):
+    """
+    Distinct (label, edge_label) keys of a node's entries once the entries
+    pointing at one neighbor x (label lx, edge labels els) are taken out.
+    """
+    if len(els) == 1:
+        # Common case: a single entry points at x
+        k = (lx, els[0])
+        if key_counts[k] == 1:
+            return [kk for kk in key_counts if kk != k]
+        return key_counts.keys()
+
+    drop = {}
+    for el in els:
+        k = (lx, el)
+        drop[k] = drop.get(k, 0) + 1
+    return [k for k, cnt in key_counts.items() if cnt > drop.get(k, 0)]
+
+
+def extract_features(g):
+    """
+    Extract small monotone graph fragments (features) present in the CSRGraph g.
     Features:
       - Edge:      ("E", a, el, b) where a<=b are node labels
       - Path-2:    ("P", a, e1, m, e2, c)  (m is center node label), canonicalized by ends
       - Path-3:    ("Q", la, e_ab, lb, e_bc, lc, e_cd, ld), canonicalized by direction
       - Triangle:  ("T", l1,l2,l3, e12,e23,e31) canonicalized by min over permutations
 
+    Paths are built from the distinct (label, edge_label) keys around each node
+    rather than from individual neighbors, so hubs with many equally labelled
+    neighbors cost little; triangles are listed once each in degree order.
+
     Returns: set of feature tuples.
     """
     feats = set()
+    lap = PROFILE.lapper(g, feats) if PROFILE.enabled else None
+
+    # Plain lists index much faster than numpy scalars in the loops below
+    node_labels = g.labels.tolist()
+    offsets = g.offsets.tolist()
+    nbrs = g.nbrs.tolist()
+    elabels = g.elabels.tolist()
+    n = len(node_labels)
+
+    # Per node: neighbor -> edge labels of its entries (in CSR order), and
+    # (neighbor label, edge label) -> number of entries
+    by_nbr = []
+    key_counts = []
+    for u in range(n):
+        d = {}
+        kc = {}
+        for i in range(offsets[u], offsets[u + 1]):
+            v, el = nbrs[i], elabels[i]
+            d.setdefault(v, []).append(el)
+            k = (node_labels[v], el)
+            kc[k] = kc.get(k, 0) + 1
+        by_nbr.append(d)
+        key_counts.append(kc)
+    if lap:
+        lap("index")
 
     # ---- Edge features ----
-    edge_seen = set()
-    for u, nbrs in adj.items():
-        for v, el in nbrs:
-            a, b = (u, v) if u < v else (v, u)
-            key = (a, b, el)
-            if key in edge_seen:
+    for u, u_nbrs in enumerate(by_nbr):
+        lu = node_labels[u]
+        for v, els in u_nbrs.items():
+            if v < u:
                 continue
-            edge_seen.add(key)
-            lu, lv = node_labels[u], node_labels[v]
+            lv = node_labels[v]
             x, y = (lu, lv) if lu <= lv else (lv, lu)
-            feats.add(("E", x, el, y))
+            for el in set(els):
+                feats.add(("E", x, el, y))
+    if lap:
+        lap("E")
 
     # ---- Path length-2 features ----
-    # For each center node m, take unordered pairs of neighbors (u, v)
-    for m, nbrs in adj.items():
+    # For each center node m, take unordered pairs of neighbor entries; a key
+    # pairs with itself only if two entries share it
+    for m, kc in enumerate(key_counts):
         lm = node_labels[m]
-        L = len(nbrs)
-        for i in range(L):
-            u, e1 = nbrs[i]
-            lu = node_labels[u]
-            for j in range(i + 1, L):
-                v, e2 = nbrs[j]
-                lv = node_labels[v]
-
-                left = (lu, e1)
-                right = (lv, e2)
-                if left <= right:
-                    a, ea = left
-                    c, ec = right
-                else:
-                    a, ea = right
-                    c, ec = left
-
+        keys = sorted(kc)
+        for i, (a, ea) in enumerate(keys):
+            if kc[(a, ea)] > 1:
+                feats.add(("P", a, ea, lm, ea, a))
+            for c, ec in keys[i + 1:]:
                 feats.add(("P", a, ea, lm, ec, c))
+    if lap:
+        lap("P")
 
     # ---- Path length-3 features ----
-    # Enumerate a-b-c-d where (b,c) is the middle edge
-    nbrs_map = {u: list(adj[u]) for u in adj}
-    for b, b_nbrs in nbrs_map.items():
+    # Enumerate a-b-c-d where (b,c) is the middle edge, taking each middle
+    # edge in one direction only (b <= c): the reverse walk gives the same
+    # canonical features
+    for b, b_nbrs in enumerate(by_nbr):
         lb = node_labels[b]
-        for c, e_bc in b_nbrs:
+        for c, e_bcs in b_nbrs.items():
+            if c < b:
+                continue
             lc = node_labels[c]
 
-            # neighbors a of b excluding c
-            for a, e_ab in b_nbrs:
-                if a == c:
-                    continue
-                la = node_labels[a]
-
-                # neighbors d of c excluding b
-                for d, e_cd in nbrs_map.get(c, []):
-                    if d == b:
-                        continue
-                    ld = node_labels[d]
+            # neighbors a of b excluding c, neighbors d of c excluding b
+            left = _keys_excluding(key_counts[b], lc, e_bcs)
+            if not left:
+                continue
+            right = _keys_excluding(key_counts[c], lb, by_nbr[c][b])
 
-                    fwd = ("Q", la, e_ab, lb, e_bc, lc, e_cd, ld)
-                    rev = ("Q", ld, e_cd, lc, e_bc, lb, e_ab, la)
-                    feats.add(fwd if fwd <= rev else rev)
+            for e_bc in set(e_bcs):
+                for la, e_ab in left:
+                    for ld, e_cd in right:
+                        fwd = ("Q", la, e_ab, lb, e_bc, lc, e_cd, ld)
+                        rev = ("Q", ld, e_cd, lc, e_bc, lb, e_ab, la)
+                        feats.add(fwd if fwd <= rev else rev)
+    if lap:
+        lap("Q")
 
     # ---- Triangle features ----
-    # Build neighbor dict for quick edge-label lookup
-    nbr_label = {}
-    for u, nbrs in adj.items():
-        d = {}
-        for v, el in nbrs:
-            d[v] = el
-        nbr_label[u] = d
+    # Forward algorithm: orient every edge towards the higher (degree, id)
+    # node; each triangle is then found exactly once, from its lowest node
+    rank = sorted(range(n), key=lambda u: (len(by_nbr[u]), u))
+    pos = [0] * n
+    for r, u in enumerate(rank):
+        pos[u] = r
+    out = [{v for v in by_nbr[u] if pos[v] > pos[u]} for u in range(n)]
 
-    nodes = sorted(node_labels.keys())
-    import itertools
+    for u in range(n):
+        out_u = out[u]
+        for v in out_u:
+            for w in out_u & out[v]:
+                a, b, c = sorted((u, v, w))
+                # The a-b edge contributes every label between them, the
+                # other two sides the label of the last entry
+                eac = by_nbr[a][c][-1]
+                ebc = by_nbr[b][c][-1]
+                la, lb, lc = node_labels[a], node_labels[b], node_labels[c]
+                for eab in set(by_nbr[a][b]):
+                    feats.add(_canon_triangle(la, lb, lc, eab, ebc, eac))
+    if lap:
+        lap("T")
 
-    for i in range(len(nodes)):
-        a = nodes[i]
-        for b, eab in adj[a]:
-            if b <= a:
-                continue
-            na = nbr_label[a]
-            nb = nbr_label[b]
-            common = set(na.keys()).intersection(nb.keys())
-            for c in common:
-                if c <= b:
-                    continue
+    return feats
 
-                eac = na[c]
-                ebc = nb[c]
-                la, lb, lc = node_labels[a], node_labels[b], node_labels[c]
 
-                # Canonicalize by checking all permutations of (a,b,c) labels
-                # while mapping edge labels correctly
-                verts = [(la, "a"), (lb, "b"), (lc, "c")]
-                edge_label = {
-                    ("a", "b"): eab, ("b", "a"): eab,
-                    ("a", "c"): eac, ("c", "a"): eac,
-                    ("b", "c"): ebc, ("c", "b"): ebc,
-                }
-
-                best = None
-                for perm in itertools.permutations(verts, 3):
-                    (l1, t1), (l2, t2), (l3, t3) = perm
-                    rep = ("T", l1, l2, l3,
-                           edge_label[(t1, t2)],
-                           edge_label[(t2, t3)],
-                           edge_label[(t3, t1)])
-                    if best is None or rep < best:
-                        best = rep
-
-                feats.add(best)
+def format_feature(f):
+    """Feature tuple -> text line body, e.g. ("E", 1, 3, 2) -> "E 1 3 2"."""
+    return " ".join(map(str, f))
 
-    return feats
+
+def parse_feature(line):
+    """Inverse of format_feature. First token is the feature type 'E'/'P'/'Q'/'T'."""
+    parts = line.split()
+    return tuple([parts[0]] + list(map(int, parts[1:])))
+
+
+class FeatureVocab:
+    """
+    Interns feature tuples to compact integer ids, assigned in first-seen order.
+    Persisted as one feature per line (same text format as the features file),
+    so the id of a feature is its line number.
+    """
+
+    def __init__(self, feats=()):
+        self.ids = {}
+        self.feats = []
+        for f in feats:
+            self.intern(f)
+
+    def __len__(self):
+        return len(self.feats)
+
+    def intern(self, f):
+        fid = self.ids.get(f)
+        if fid is None:
+            fid = len(self.feats)
+            self.ids[f] = fid
+            self.feats.append(f)
+        return fid
+
+    def intern_all(self, feats):
+        return [self.intern(f) for f in feats]
+
+    def lookup(self, feats):
+        """Ids of the features already in the vocabulary; unknown ones are skipped."""
+        ids = self.ids
+        return [ids[f] for f in feats if f in ids]
+
+    def save(self, path):
+        with open(path, "w") as out:
+            for f in self.feats:
+                out.write(format_feature(f) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        vocab = cls()
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    vocab.intern(parse_feature(line))
+        return vocab
+
+
+# Chunks queued per pool worker by extract_all_features
+IN_FLIGHT = 2
+
+
+def _extract_chunk(chunk):
+    # Profiling counters of the worker travel back with its results
+    return [extract_features(g) for g in chunk], PROFILE.drain()
+
+
+def extract_all_features(graphs, workers=1, chunk_size=None):
+    """
+    Run extract_features over a list (or any iterable, e.g. iter_graphs) of CSRGraph.
+    With workers > 1 the graphs are split into contiguous chunks and sharded
+    across a process pool; results still come back in the original graph order.
+    Yields: one feature set per graph.
+    """
+    if workers <= 1:
+        for g in graphs:
+            yield extract_features(g)
+        return
+
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool balanced without paying
+        # per-graph IPC overhead; a stream of unknown length gets fixed chunks
+        chunk_size = max(1, len(graphs) // (workers * 4)) if hasattr(graphs, "__len__") else 256
+
+    if isinstance(graphs, GraphStore):
+        # Slices pickle as (path, ids): workers read the mapped store directly
+        chunks = (graphs[s:s + chunk_size] for s in range(0, len(graphs), chunk_size))
+    else:
+        it = iter(graphs)
+        chunks = iter(lambda: list(itertools.islice(it, chunk_size)), [])
+
+    # At most IN_FLIGHT chunks per worker are parsed and queued ahead of the
+    # consumer, so streaming input stays streaming (Pool.imap would drain it)
+    with Pool(processes=workers, initializer=reset_worker) as pool:
+        pending = deque()
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                pending.append(pool.apply_async(_extract_chunk, (chunk,)))
+                if len(pending) < IN_FLIGHT * workers:
+                    continue
+            while pending and (chunk is None or len(pending) >= IN_FLIGHT * workers):
+                part, stats = pending.popleft().get()
+                PROFILE.merge(stats)
+                yield from part
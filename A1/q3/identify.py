@@ -1,57 +1,163 @@
-import sys
-import numpy as np
-from graph_utils import read_graphs, graph_signature, extract_features
+import argparse
+import math
+import random
+from graph_utils import (read_graphs, take, graph_signatures, extract_all_features,
+                         format_feature, FeatureVocab, DEDUP_MODES)
+from feature_cache import cached_features
+from profiling import PROFILE
 
 K = 200
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python identify.py <db_graphs> <out_features>")
-        sys.exit(1)
-
-    db_path = sys.argv[1]
-    out_path = sys.argv[2]
-
-    graphs = read_graphs(db_path)
-
-    # Deduplicate for feature mining only, preserving first occurrence order
+def first_occurrences(signatures):
+    """Indices of the first graph with each signature, in order."""
     seen = set()
-    unique = []
-    for (nl, adj) in graphs:
-        sig = graph_signature(nl, adj)
+    keep = []
+    for i, sig in enumerate(signatures):
         if sig in seen:
             continue
         seen.add(sig)
-        unique.append((nl, adj))
+        keep.append(i)
+    return keep
+
+def count_features(per_graph, keep=None):
+    """
+    Count, for each feature, the graphs containing it.
+    If keep is given, only features in it are interned and counted.
+    Returns (vocab, feat_count) with feat_count[fid] = number of graphs.
+    """
+    vocab = FeatureVocab()
+    feat_count = []
+
+    for feats in per_graph:
+        if keep is not None:
+            feats = [f for f in feats if f in keep]
+        ids = vocab.intern_all(feats)
+        feat_count.extend([0] * (len(vocab) - len(feat_count)))
+        for fid in ids:
+            feat_count[fid] += 1
+
+    return vocab, feat_count
+
+def score_range(lo, hi):
+    """Min and max of p(1-p) over p in [lo, hi]."""
+    g = lambda p: p * (1 - p)
+    return min(g(lo), g(hi)), g(min(max(0.5, lo), hi))
+
+def sample_survivors(per_sample, s, k, delta):
+    """
+    Features of a uniform sample of s graphs that may still rank in the top k.
+    Each sampled frequency is within eps of the true one (Hoeffding, union
+    bound over the sampled features, probability >= 1 - delta). A feature
+    survives unless its best possible score is below the k-th best worst-case
+    score. A top-k feature can also be missed entirely by the sample; that is
+    bounded by k * (1 - p_min)^s, where p_min is the lowest frequency that
+    still reaches the threshold.
+    Returns (survivors, eps, error_bound); survivors is None if nothing can be pruned.
+    """
+    vocab, counts = count_features(per_sample)
+    F = len(vocab)
+    if F == 0:
+        return None, 0.0, 0.0
+
+    eps = math.sqrt(math.log(2 * F / delta) / (2 * s))
+    bounds = [score_range(max(0.0, c / s - eps), min(1.0, c / s + eps)) for c in counts]
+
+    lower = sorted((lo for lo, _ in bounds), reverse=True)
+    threshold = lower[k - 1] if F >= k else 0.0
+    if threshold <= 0.0:
+        return None, eps, 0.0
+
+    survivors = {vocab.feats[fid] for fid, (_, hi) in enumerate(bounds) if hi >= threshold}
+    p_min = (1 - math.sqrt(max(0.0, 1 - 4 * threshold))) / 2
+    miss = k * (1 - p_min) ** s
+    return survivors, eps, min(1.0, delta + miss)
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python identify.py <db_graphs> <out_features> [--workers N] [--cache DIR] [--dedup MODE]"
+              " [--sample S [--delta D] [--seed X]] [--profile PATH]")
+    parser.add_argument("db_graphs")
+    parser.add_argument("out_features")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for feature extraction (default: 1, serial)")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse per-graph features extracted by earlier runs on the same file")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="labels",
+                        help="graph dedup hash: label/edge multisets (default) or structural WL hash")
+    parser.add_argument("--sample", type=int, metavar="S",
+                        help="approximate mode: prune candidates on S sampled graphs, "
+                             "then count only the survivors exactly")
+    parser.add_argument("--delta", type=float, default=0.01,
+                        help="failure probability of the --sample confidence bounds (default: 0.01)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for --sample (default: 0)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="append a JSON record of stage timings, feature enumeration costs, "
+                             "graph sizes and peak memory to PATH (env: Q3_PROFILE)")
+    args = parser.parse_args()
+    PROFILE.start("identify", args.profile)
+
+    db_path = args.db_graphs
+    out_path = args.out_features
+
+    # Deduplicate for feature mining only, preserving first occurrence order
+    if args.cache:
+        with PROFILE.stage("cached_features"):
+            cache_vocab, signatures, feat_ids = cached_features(db_path, args.cache, workers=args.workers,
+                                                                dedup=args.dedup)
+            unique = [feat_ids[i] for i in first_occurrences(signatures)]
+        features_of = lambda items: ([cache_vocab.feats[fid] for fid in ids.tolist()] for ids in items)
+    else:
+        with PROFILE.stage("read_graphs"):
+            graphs = read_graphs(db_path)
+        with PROFILE.stage("dedup"):
+            unique = take(graphs, first_occurrences(graph_signatures(graphs, args.dedup)))
+        features_of = lambda items: extract_all_features(items, workers=args.workers)
 
     n = len(unique)
-    feat_count = {}
 
-    for (nl, adj) in unique:
-        feats = extract_features(nl, adj)
-        for f in feats:
-            feat_count[f] = feat_count.get(f, 0) + 1
+    # Approximate mode: a sample decides which features are worth counting
+    survivors = None
+    if args.sample is not None and args.sample < n:
+        s = max(1, args.sample)
+        picked = sorted(random.Random(args.seed).sample(range(n), s))
+        with PROFILE.stage("sample"):
+            survivors, eps, err = sample_survivors(features_of(take(unique, picked)), s, K, args.delta)
+        if survivors is None:
+            print(f"Sample of {s} graphs cannot prune (eps={eps:.4f}); counting all features")
+        else:
+            print(f"Sampled {s} graphs: eps={eps:.4f}, {len(survivors)} candidate features survive; "
+                  f"P(selection differs from exact) <= {err:.3g}")
+
+    # Count by interned id: feat_count[fid] = number of unique graphs with it
+    # (Extraction is lazy, so this stage includes it when not cached)
+    with PROFILE.stage("count_features"):
+        vocab, feat_count = count_features(features_of(unique), keep=survivors)
 
-    # Score: p(1-p) where p = freq fraction
-    scored = []
-    for f, c in feat_count.items():
-        p = c / n
-        score = p * (1 - p)
-        scored.append((score, c, f))
+    with PROFILE.stage("score"):
+        # Score: p(1-p) where p = freq fraction
+        scored = []
+        for fid, c in enumerate(feat_count):
+            p = c / n
+            score = p * (1 - p)
+            scored.append((score, c, vocab.feats[fid]))
 
-    # Sort: highest discriminativeness, then more support as tie-breaker
-    scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+        # Sort: highest discriminativeness, then more support as tie-breaker
+        scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
 
-    selected = [f for (_, _, f) in scored[:K]]
+        selected = [f for (_, _, f) in scored[:K]]
 
-    # Write features as plain text, one per line
-    # Example line: E 1 3 2   OR   P 1 1 2 2 3  OR  T ...
-    with open(out_path, "w") as out:
-        for f in selected:
-            out.write(" ".join(map(str, f)) + "\n")
+    with PROFILE.stage("write"):
+        # Write features as plain text, one per line
+        # Example line: E 1 3 2   OR   P 1 1 2 2 3  OR  T ...
+        with open(out_path, "w") as out:
+            for f in selected:
+                out.write(format_feature(f) + "\n")
 
     print(f"Unique graphs used for mining: {n}")
     print(f"Selected {len(selected)} features -> {out_path}")
+    print(f"Feature vocabulary: {len(vocab)} ids")
+    PROFILE.finish(n_unique_graphs=n, n_vocab=len(vocab))
 
 if __name__ == "__main__":
     main()
@@ -2,8 +2,8 @@
 set -euo pipefail
 
 # Usage:
-# bash identify.sh <path_graph_dataset> <path_discriminative_subgraphs>
+# bash identify.sh <path_graph_dataset> <path_discriminative_subgraphs> [--workers N] [--cache DIR] [--dedup labels|wl] [--sample S] [--profile PATH]
 DATASET="$1"
 OUT_FEATURES="$2"
 
-python3 identify.py "$DATASET" "$OUT_FEATURES"
+python3 identify.py "$DATASET" "$OUT_FEATURES" "${@:3}"
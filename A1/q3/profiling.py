@@ -0,0 +1,145 @@
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+# Opt-in instrumentation of the q3 scripts: --profile PATH or Q3_PROFILE=PATH.
+# Each profiled run appends one JSON record to PATH:
+#   stages:     wall seconds of each stage of the script, in order
+#   features:   per feature type (E/P/Q/T, plus "index" for the per-graph
+#               neighbor tables): seconds spent in extract_features and
+#               distinct features emitted, summed over graphs
+#   graph_sizes / graph_edges: power-of-two histograms of the extracted graphs
+#   peak_rss_kb: peak RSS of the script and of its (largest) worker process
+# When disabled, extract_features pays one attribute check per graph.
+PROFILE_ENV = "Q3_PROFILE"
+RECORD_FIELDS = frozenset(("timestamp", "script", "argv", "python", "wall_s", "stages", "features",
+                           "graphs_extracted", "graph_sizes", "graph_edges", "peak_rss_kb",
+                           "peak_worker_rss_kb"))
+
+
+def _bucket(x):
+    return 1 << max(0, x - 1).bit_length()
+
+
+def _histogram(hist):
+    return {f"<={b}": hist[b] for b in sorted(hist)}
+
+
+class Profiler:
+    def __init__(self):
+        self.path = os.environ.get(PROFILE_ENV) or None
+        self.enabled = self.path is not None
+        self.script = None
+        self.stages = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Per-graph extraction counters (the part worker processes report back)."""
+        self.seconds = {}
+        self.counts = {}
+        self.graphs = 0
+        self.sizes = {}
+        self.edges = {}
+
+    def start(self, script, path=None):
+        """Enable profiling if path (or Q3_PROFILE) is given. Worker processes inherit it."""
+        if path:
+            self.path = path
+            self.enabled = True
+            os.environ[PROFILE_ENV] = path
+        self.script = script
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def lapper(self, g, feats):
+        """
+        Section timer for one extract_features call on g: lap(name) charges the
+        time and the features added to feats since the previous lap to name.
+        """
+        self.graphs += 1
+        b = _bucket(g.labels.size)
+        self.sizes[b] = self.sizes.get(b, 0) + 1
+        b = _bucket(g.nbrs.size // 2)
+        self.edges[b] = self.edges.get(b, 0) + 1
+
+        last = [time.perf_counter(), 0]
+        seconds, counts = self.seconds, self.counts
+
+        def lap(name):
+            now, n = time.perf_counter(), len(feats)
+            seconds[name] = seconds.get(name, 0.0) + now - last[0]
+            counts[name] = counts.get(name, 0) + n - last[1]
+            last[0], last[1] = now, n
+
+        return lap
+
+    def drain(self):
+        """Take the extraction counters accumulated so far (None when disabled)."""
+        if not self.enabled:
+            return None
+        stats = (self.seconds, self.counts, self.graphs, self.sizes, self.edges)
+        self.reset_counters()
+        return stats
+
+    def merge(self, stats):
+        """Add counters drained in a worker process."""
+        if stats is None:
+            return
+        seconds, counts, graphs, sizes, edges = stats
+        for mine, theirs in ((self.seconds, seconds), (self.counts, counts),
+                             (self.sizes, sizes), (self.edges, edges)):
+            for k, v in theirs.items():
+                mine[k] = mine.get(k, 0) + v
+        self.graphs += graphs
+
+    def finish(self, **extra):
+        """
+        Append the run's record to the profile file (no-op when disabled).
+        extra: script-specific counts, which must not shadow the fields above.
+        """
+        clash = RECORD_FIELDS.intersection(extra)
+        if clash:
+            raise ValueError(f"profile fields reserved by the record: {', '.join(sorted(clash))}")
+        if not self.enabled:
+            return
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "wall_s": round(time.perf_counter() - self._t0, 4),
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "features": {k: {"seconds": round(self.seconds[k], 4), "count": self.counts[k]}
+                         for k in self.seconds},
+            "graphs_extracted": self.graphs,
+            "graph_sizes": _histogram(self.sizes),
+            "graph_edges": _histogram(self.edges),
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "peak_worker_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            **extra,
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Profile -> {self.path}", file=sys.stderr)
+
+
+PROFILE = Profiler()
+
+
+def reset_worker():
+    """Pool initializer: forked workers must not report the parent's counters again."""
+    PROFILE.reset_counters()
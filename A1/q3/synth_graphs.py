@@ -0,0 +1,125 @@
+import argparse
+import random
+
+from graph_utils import read_graphs
+
+
+def _labels(rng, count, alphabet, skew):
+    """count labels from 0..alphabet-1, Zipf-distributed with exponent skew (0 = uniform)."""
+    weights = [1.0 / (i + 1) ** skew for i in range(alphabet)]
+    return rng.choices(range(alphabet), weights=weights, k=count)
+
+
+def random_graph(rng, n, avg_degree, degree_dist, node_labels, edge_labels, skew):
+    """
+    Connected labeled graph on n nodes with about n * avg_degree / 2 edges.
+    degree_dist:
+      "uniform":  random recursive tree plus uniformly chosen extra edges
+      "powerlaw": preferential attachment for both the tree and extra edges,
+                  which produces a few high-degree hubs
+    Returns (labels, edges) with edges as (u, v, edge_label), u < v.
+    """
+    labels = _labels(rng, n, node_labels, skew)
+    edges = set()
+    # Endpoint pool: every node once per incident edge (plus once for itself),
+    # so a uniform draw from it is degree-proportional
+    pool = [0]
+
+    def pick():
+        return rng.choice(pool) if degree_dist == "powerlaw" else rng.randrange(n)
+
+    for v in range(1, n):
+        u = rng.choice(pool) if degree_dist == "powerlaw" else rng.randrange(v)
+        edges.add((u, v))
+        pool.extend((u, v))
+
+    target = max(n - 1, min(n * (n - 1) // 2, round(n * avg_degree / 2)))
+    attempts = 0
+    while len(edges) < target and attempts < 10 * target:
+        attempts += 1
+        a, b = pick(), pick()
+        if a == b:
+            continue
+        e = (a, b) if a < b else (b, a)
+        if e in edges:
+            continue
+        edges.add(e)
+        pool.extend(e)
+
+    elabs = _labels(rng, len(edges), edge_labels, skew)
+    return labels, [(u, v, el) for (u, v), el in zip(sorted(edges), elabs)]
+
+
+def random_query(rng, g, size):
+    """Connected subgraph of the CSRGraph g grown by random BFS to at most size nodes."""
+    n = g.labels.size
+    offsets, nbrs = g.offsets.tolist(), g.nbrs.tolist()
+    start = rng.randrange(n)
+    picked = [start]
+    chosen = {start}
+    frontier = [start]
+    while frontier and len(picked) < size:
+        u = frontier.pop(rng.randrange(len(frontier)))
+        for v in rng.sample(nbrs[offsets[u]:offsets[u + 1]], offsets[u + 1] - offsets[u]):
+            if v not in chosen and len(picked) < size:
+                chosen.add(v)
+                picked.append(v)
+                frontier.append(v)
+
+    index = {u: i for i, u in enumerate(picked)}
+    labels = [int(g.labels[u]) for u in picked]
+    edges = []
+    for u in picked:
+        for i in range(offsets[u], offsets[u + 1]):
+            v = nbrs[i]
+            if v in index and u < v:
+                edges.append((index[u], index[v], int(g.elabels[i])))
+    return labels, edges
+
+
+def write_graphs(path, graphs):
+    with open(path, "w") as out:
+        for labels, edges in graphs:
+            out.write("#\n")
+            for i, lab in enumerate(labels):
+                out.write(f"v {i} {lab}\n")
+            for u, v, el in edges:
+                out.write(f"e {u} {v} {el}\n")
+            out.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Synthetic labeled graphs in the assignment format (database or queries).")
+    parser.add_argument("out")
+    parser.add_argument("--graphs", type=int, default=1000, help="number of graphs to write")
+    parser.add_argument("--nodes", type=int, default=20, help="mean nodes per graph (query size with --queries-from)")
+    parser.add_argument("--nodes-spread", type=int, default=10, help="graph sizes are uniform in nodes +- spread")
+    parser.add_argument("--avg-degree", type=float, default=2.2)
+    parser.add_argument("--degree-dist", choices=("uniform", "powerlaw"), default="uniform")
+    parser.add_argument("--node-labels", type=int, default=6, help="node label alphabet size")
+    parser.add_argument("--edge-labels", type=int, default=3, help="edge label alphabet size")
+    parser.add_argument("--label-skew", type=float, default=1.0, help="Zipf exponent of label frequencies")
+    parser.add_argument("--queries-from", metavar="DB",
+                        help="write connected subgraphs of graphs in DB instead of fresh graphs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lo = max(1, args.nodes - args.nodes_spread)
+    hi = max(lo, args.nodes + args.nodes_spread)
+
+    if args.queries_from:
+        db = read_graphs(args.queries_from)
+        graphs = [random_query(rng, rng.choice(db), rng.randint(lo, hi)) for _ in range(args.graphs)]
+    else:
+        graphs = [random_graph(rng, rng.randint(lo, hi), args.avg_degree, args.degree_dist,
+                               args.node_labels, args.edge_labels, args.label_skew)
+                  for _ in range(args.graphs)]
+
+    write_graphs(args.out, graphs)
+    print(f"Wrote {len(graphs)} graphs -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import time
+from functools import lru_cache
+from multiprocessing import Pool
+from graph_utils import read_graphs
+from profiling import PROFILE
+
+# Graphs are loaded once per process: inherited on fork, re-read by the pool
+# initializer otherwise
+_DB = None
+_QUERIES = None
+
+
+def read_candidates(path):
+    """Parse a q # / c # file into a list of (query number, [db graph numbers]), 1-indexed."""
+    out = []
+    qid = None
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == "q":
+                qid = int(parts[2])
+            elif parts[0] == "c":
+                out.append((qid, list(map(int, parts[2:]))))
+    return out
+
+
+class Pattern:
+    """
+    Matching view of a CSRGraph:
+      labels:  node labels
+      adj:     adj[u] = {v: set of edge labels between u and v}
+      keys:    keys[u] = {(neighbor label, edge label): count}, used for pruning
+      self_loops: self_loops[u] = edge labels of loops on u
+    """
+
+    def __init__(self, g):
+        self.labels = g.labels.tolist()
+        offsets, nbrs, elabels = g.offsets.tolist(), g.nbrs.tolist(), g.elabels.tolist()
+        n = len(self.labels)
+        self.adj = [{} for _ in range(n)]
+        self.keys = [{} for _ in range(n)]
+        self.self_loops = [set() for _ in range(n)]
+        for u in range(n):
+            for i in range(offsets[u], offsets[u + 1]):
+                v, el = nbrs[i], elabels[i]
+                if v == u:
+                    self.self_loops[u].add(el)
+                    continue
+                els = self.adj[u].setdefault(v, set())
+                if el not in els:
+                    els.add(el)
+                    k = (self.labels[v], el)
+                    self.keys[u][k] = self.keys[u].get(k, 0) + 1
+        self.label_count = {}
+        for lab in self.labels:
+            self.label_count[lab] = self.label_count.get(lab, 0) + 1
+
+
+def _dominates(big, small):
+    return all(big.get(k, 0) >= c for k, c in small.items())
+
+
+def _match_order(q):
+    """
+    Query nodes in matching order: start from the highest-degree node, then
+    repeatedly take the node with most already-ordered neighbors (ties: higher
+    degree), so every node after the first is anchored to a mapped parent.
+    """
+    n = len(q.labels)
+    order = []
+    placed = [False] * n
+    links = [0] * n
+    while len(order) < n:
+        best = max((u for u in range(n) if not placed[u]),
+                   key=lambda u: (links[u], len(q.adj[u])))
+        order.append(best)
+        placed[best] = True
+        for v in q.adj[best]:
+            links[v] += 1
+    return order
+
+
+def contains(g, q, order):
+    """
+    VF2-style backtracking: is q (non-induced, label-preserving) a subgraph of g?
+    Candidates are pruned by node label, degree and the multiset of
+    (neighbor label, edge label) keys before any edge checks.
+    """
+    n = len(q.labels)
+    if n == 0:
+        return True
+    if n > len(g.labels) or not _dominates(g.label_count, q.label_count):
+        return False
+
+    # Per query node, the db nodes that can host it
+    domain = []
+    for u in range(n):
+        lu, ku, du, lu_loops = q.labels[u], q.keys[u], len(q.adj[u]), q.self_loops[u]
+        dom = {v for v in range(len(g.labels))
+               if g.labels[v] == lu and len(g.adj[v]) >= du
+               and _dominates(g.keys[v], ku) and lu_loops <= g.self_loops[v]}
+        if not dom:
+            return False
+        domain.append(dom)
+
+    # Earlier-ordered neighbors of each query node, checked when it is mapped
+    pos = {u: i for i, u in enumerate(order)}
+    back = [[w for w in q.adj[u] if pos[w] < pos[u]] for u in order]
+
+    mapping = [-1] * n
+    used = set()
+
+    def extend(i):
+        if i == n:
+            return True
+        u = order[i]
+        links = back[i]
+        if links:
+            # Anchor on one mapped neighbor: only its db neighbors can host u
+            cands = g.adj[mapping[links[0]]].keys() & domain[u]
+        else:
+            cands = domain[u]
+        for v in cands:
+            if v in used:
+                continue
+            gv = g.adj[v]
+            ok = True
+            for w in links:
+                els = gv.get(mapping[w])
+                if els is None or not q.adj[u][w] <= els:
+                    ok = False
+                    break
+            if not ok:
+                continue
+            mapping[u] = v
+            used.add(v)
+            if extend(i + 1):
+                return True
+            used.discard(v)
+        mapping[u] = -1
+        return False
+
+    return extend(0)
+
+
+@lru_cache(maxsize=4096)
+def _db_pattern(idx):
+    return Pattern(_DB[idx])
+
+
+def _init(db_path, q_path):
+    global _DB, _QUERIES
+    if _DB is None:
+        _DB = read_graphs(db_path)
+        _QUERIES = read_graphs(q_path)
+
+
+def verify_query(task):
+    """Exact answers for one query among its candidates; returns (qid, answers, seconds)."""
+    qid, cands = task
+    start = time.perf_counter()
+    q = Pattern(_QUERIES[qid - 1])
+    order = _match_order(q)
+    answers = [c for c in cands if contains(_db_pattern(c - 1), q, order)]
+    return qid, answers, time.perf_counter() - start
+
+
+def main():
+    global _DB, _QUERIES
+    parser = argparse.ArgumentParser(
+        usage="python verify.py <db_graphs> <query_graphs> <candidates.dat> <out_answers.dat> "
+              "[--workers N] [--timings PATH] [--profile PATH]")
+    parser.add_argument("db_graphs")
+    parser.add_argument("query_graphs")
+    parser.add_argument("candidates")
+    parser.add_argument("out_answers")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for verification (default: 1, serial)")
+    parser.add_argument("--timings", help="per-query timing TSV (default: <out_answers>.timings.tsv)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="append a JSON record of stage timings and peak memory to PATH (env: Q3_PROFILE)")
+    args = parser.parse_args()
+    PROFILE.start("verify", args.profile)
+
+    with PROFILE.stage("read_graphs"):
+        _init(args.db_graphs, args.query_graphs)
+        tasks = read_candidates(args.candidates)
+    timings_path = args.timings or args.out_answers + ".timings.tsv"
+
+    start = time.perf_counter()
+    with PROFILE.stage("verify"):
+        if args.workers > 1:
+            with Pool(args.workers, initializer=_init, initargs=(args.db_graphs, args.query_graphs)) as pool:
+                results = pool.map(verify_query, tasks, chunksize=1)
+        else:
+            results = [verify_query(t) for t in tasks]
+    total = time.perf_counter() - start
+
+    n_cands = {qid: len(c) for qid, c in tasks}
+    with open(args.out_answers, "w") as out, open(timings_path, "w") as tout:
+        tout.write("query\tcandidates\tanswers\tseconds\n")
+        for qid, answers, secs in results:
+            out.write(f"q # {qid}\n")
+            out.write("c # " + " ".join(map(str, answers)) + "\n")
+            tout.write(f"{qid}\t{n_cands[qid]}\t{len(answers)}\t{secs:.6f}\n")
+
+    print(f"Verified {len(results)} queries in {total:.3f}s -> {args.out_answers} (timings: {timings_path})")
+    PROFILE.finish(n_queries=len(results), n_candidates=sum(n_cands.values()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/bin/bash
+set -euo pipefail
+
+# Usage:
+# bash verify.sh <path_database_graphs> <path_query_graphs> <path_candidates> <path_out_answers> [--workers N] [--profile PATH]
+DB_GRAPHS="$1"
+Q_GRAPHS="$2"
+CANDIDATES="$3"
+OUT_FILE="$4"
+
+python3 verify.py "$DB_GRAPHS" "$Q_GRAPHS" "$CANDIDATES" "$OUT_FILE" "${@:5}"
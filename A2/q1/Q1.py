@@ -1,43 +1,609 @@
 import sys
+import os
+import re
+import io
+import time
+import argparse
+import threading
 import urllib.request, json
+from multiprocessing import Pool
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from threadpoolctl import threadpool_limits
 import matplotlib.pyplot as plt
-def load_data(arg):
+
+K_RANGE = range(1,16)
+N_INIT = 20
+WARM_N_INIT = 3
+# Approximate modes for large (memory-mapped) datasets
+SAMPLE = 50000
+CHUNK_ROWS = 1 << 16
+BOOTSTRAP = 200
+
+SERVER = os.environ.get("Q1_SERVER", "http://10.208.23.248:3000")
+STUDENT_ID = "me1221438"
+# Preferred response formats, best first; the server picks by Content-Type
+ACCEPT = "application/x-npy, application/octet-stream;q=0.9, application/json;q=0.5"
+READ_CHUNK = 1 << 20
+
+def _replace_atomically(path, write):
+    # Unique per thread too: batch prefetch threads may stage the same dataset at once
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _json_rows(stream, key="X"):
+    """
+    Stream-decodes data[key] of a JSON response, a list of numeric rows (or
+    a flat list of numbers), without building the document or Python lists:
+    complete rows are cut out of each chunk and parsed by NumPy in bulk.
+    Yields float64 blocks of rows.
+    """
+    dec = io.TextIOWrapper(stream, encoding="utf-8")
+    buf = ""
+    # Locate the opening bracket of the key's array
+    while True:
+        m = re.search(r'"%s"\s*:\s*\[' % re.escape(key), buf)
+        if m:
+            buf = buf[m.end():]
+            break
+        chunk = dec.read(READ_CHUNK)
+        if not chunk:
+            raise ValueError(f"no {key!r} array in the response")
+        buf = buf[-len(key) - 16:] + chunk
+
+    brackets = str.maketrans("[]", "  ")
+    flat = None
+    while True:
+        head = buf.lstrip(" \t\r\n,")
+        if flat is None and head:
+            flat = not head.startswith("[")
+        if flat:
+            end = buf.find("]")
+            body = buf if end < 0 else buf[:end]
+            # Keep a possibly cut number for the next chunk
+            cut = len(body) if end >= 0 else body.rfind(",") + 1
+            if body[:cut].strip(" \t\r\n,"):
+                yield np.fromstring(body[:cut].strip(" \t\r\n,"), sep=",")
+            if end >= 0:
+                return
+            buf = body[cut:]
+        elif head.startswith("]"):
+            return
+        else:
+            # Complete rows: up to the array's closing "]]" if present, else the last "]"
+            m = re.search(r"\]\s*\]", buf)
+            last = m.start() + 1 if m else buf.rfind("]") + 1
+            seg = buf[:last].lstrip(" \t\r\n,")
+            if seg:
+                # "[a,b],[c,d]" -> " a,b , c,d ": one comma-separated run of numbers
+                rows = seg.count("[")
+                yield np.fromstring(seg.translate(brackets), sep=",").reshape(rows, -1)
+            if m:
+                return
+            buf = buf[last:]
+        chunk = dec.read(READ_CHUNK)
+        if not chunk:
+            raise ValueError(f"truncated {key!r} array in the response")
+        buf += chunk
+
+def fetch_dataset(dataset_number, out_path=None, server=SERVER):
+    """
+    Downloads one dataset. The server may answer with .npy bytes, raw
+    float32 (shape in an X-Shape: n,d header) or the original JSON. With
+    out_path the array is streamed to that .npy file instead of returned.
+    """
+    url = f"{server}/dataset?student_id={STUDENT_ID}&dataset_num={dataset_number}"
+    request = urllib.request.Request(url, headers={"Accept": ACCEPT})
+    with urllib.request.urlopen(request) as response:
+        ctype = response.headers.get("Content-Type", "").split(";")[0].strip()
+        shape = response.headers.get("X-Shape")
+
+        if ctype == "application/x-npy" and out_path:
+            with open(out_path, "wb") as f:
+                for block in iter(lambda: response.read(READ_CHUNK), b""):
+                    f.write(block)
+            return None
+        if ctype == "application/x-npy":
+            return np.load(io.BytesIO(response.read()))
+
+        if ctype == "application/octet-stream" and shape:
+            shape = tuple(int(x) for x in shape.split(","))
+            dtype = np.dtype(response.headers.get("X-Dtype", "<f4"))
+            if out_path:
+                X = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=shape)
+                flat = X.reshape(-1).view(np.uint8)
+                pos = 0
+                for block in iter(lambda: response.read(READ_CHUNK), b""):
+                    flat[pos:pos + len(block)] = np.frombuffer(block, dtype=np.uint8)
+                    pos += len(block)
+                X.flush()
+                del X
+                if pos != flat.size:
+                    raise ValueError(f"truncated response: {pos} of {flat.size} bytes")
+                return None
+            return np.frombuffer(response.read(), dtype=dtype).reshape(shape)
+
+        blocks = list(_json_rows(response))
+        X = np.concatenate(blocks) if blocks else np.zeros(0)
+        if out_path:
+            # Through a handle: np.save would append .npy to the temp name
+            with open(out_path, "wb") as f:
+                np.save(f, X)
+            return None
+        return X
+
+def load_data(arg, cache_dir=None, server=SERVER):
+    """
+    A dataset number (downloaded) or a path to a .npy file. With cache_dir,
+    downloads are kept as <cache_dir>/dataset_<n>.npy and later runs load
+    that file memory-mapped instead of fetching again.
+    """
     if arg.isdigit():
         dataset_number= int(arg)
-        url = f"http://10.208.23.248:3000/dataset?student_id=me1221438&dataset_num={dataset_number}"
-        with urllib.request.urlopen(url) as response:
-            raw = response.read().decode("utf-8")
-            data = json.loads(raw)
-        return np.array(data["X"])
+        if cache_dir is None:
+            return fetch_dataset(dataset_number, server=server)
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"dataset_{dataset_number}.npy")
+        if not os.path.exists(path):
+            _replace_atomically(path, lambda tmp: fetch_dataset(dataset_number, tmp, server))
+        return np.load(path, mmap_mode="r")
     else:
         return np.load(arg)
-def main():
-    data = load_data(sys.argv[1])
-    k_range = range(1,16)
-    inertias = []
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k,n_init=20)
-        kmeans.fit(data)
-        inertias.append(kmeans.inertia_)
-    plt.plot(k_range, inertias, marker='o')
-    plt.xlabel("k")
-    plt.ylabel("Inertia")
-    plt.savefig("plot.png")
 
-    ks = np.array(list(k_range))
-    inertias = np.array(inertias)
+def fit_k(data, k, n_init=N_INIT, seed=None):
+    """One k of the sweep from scratch (k-means++, n_init restarts). Returns (inertia, centers, seconds)."""
+    start = time.perf_counter()
+    kmeans = KMeans(n_clusters=k, n_init=n_init, random_state=seed)
+    kmeans.fit(data)
+    return kmeans.inertia_, kmeans.cluster_centers_, time.perf_counter() - start
+
+# Worker side of the process pool: the data is sent once per worker
+_DATA = None
+
+def _init_worker(data, threads):
+    global _DATA
+    _DATA = data
+    # Keep workers x BLAS/OpenMP threads within the machine
+    threadpool_limits(threads)
+
+def _fit_task(task):
+    k, n_init, seed = task
+    inertia, _, secs = fit_k(_DATA, k, n_init, seed)
+    return k, inertia, secs
+
+def sweep_full(data, k_range, n_init=N_INIT, workers=1, seed=None):
+    """
+    Every k fitted independently; with workers > 1 the k values run
+    concurrently in a process pool (largest k first, they take longest).
+    Returns {k: (inertia, seconds)}.
+    """
+    tasks = [(k, n_init, None if seed is None else seed + k) for k in k_range]
+    if workers <= 1:
+        return {k: fit_k(data, k, n, s)[::2] for k, n, s in tasks}
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with Pool(workers, initializer=_init_worker, initargs=(data, threads)) as pool:
+        done = pool.imap_unordered(_fit_task, sorted(tasks, reverse=True))
+        return {k: (inertia, secs) for k, inertia, secs in done}
+
+def split_seeds(data, centers, n_seeds, rng):
+    """
+    Initial centers for k+1 from a k solution: the k centers plus one new
+    center split off a cluster. The first seed splits the cluster with the
+    largest SSE at its farthest point; the others pick the cluster in
+    proportion to SSE and the point in proportion to squared distance.
+    """
+    d2 = (data ** 2).sum(axis=1)[:, None] - 2 * data @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    d2 = np.maximum(d2, 0)
+    labels = d2.argmin(axis=1)
+    dist = d2[np.arange(len(data)), labels]
+    sse = np.bincount(labels, weights=dist, minlength=len(centers))
+
+    seeds = []
+    for s in range(n_seeds):
+        if s == 0 or sse.sum() == 0:
+            c = sse.argmax()
+            members = np.flatnonzero(labels == c)
+            pick = members[dist[members].argmax()]
+        else:
+            c = rng.choice(len(centers), p=sse / sse.sum())
+            members = np.flatnonzero(labels == c)
+            w = dist[members]
+            pick = members[rng.choice(members.size, p=w / w.sum())] if w.sum() > 0 else rng.choice(members)
+        seeds.append(np.vstack([centers, data[pick]]))
+    return seeds
+
+def sweep_warm(data, k_range, n_init=WARM_N_INIT, seed=None):
+    """
+    Warm-started sweep: the first k is fitted from scratch, every following k
+    starts from the previous solution plus one split centroid (n_init split
+    choices, one Lloyd run each). The k values must be consecutive.
+    Returns {k: (inertia, seconds)}.
+    """
+    rng = np.random.default_rng(seed)
+    ks = list(k_range)
+    out = {}
+    inertia, centers, secs = fit_k(data, ks[0], N_INIT, seed)
+    out[ks[0]] = (inertia, secs)
+    for k in ks[1:]:
+        start = time.perf_counter()
+        best = None
+        for init in split_seeds(data, centers, n_init, rng):
+            kmeans = KMeans(n_clusters=k, init=init, n_init=1)
+            kmeans.fit(data)
+            if best is None or kmeans.inertia_ < best.inertia_:
+                best = kmeans
+        centers = best.cluster_centers_
+        out[k] = (best.inertia_, time.perf_counter() - start)
+    return out
+
+def elbow_k(ks, inertias):
+    """k farthest from the chord between the first and last point of the inertia curve."""
+    ks = np.asarray(ks)
+    inertias = np.asarray(inertias)
     p1 = np.array([ks[0], inertias[0]])
     p2 = np.array([ks[-1], inertias[-1]])
 
     distances = []
     for i in range(len(ks)):
         p = np.array([ks[i], inertias[i]])
-        dist = abs((p2[0]-p1[0])*(p1[1]-p[1]) - (p1[0]-p[0])*(p2[1]-p1[1])) / np.linalg.norm(p2-p1)        
+        dist = abs((p2[0]-p1[0])*(p1[1]-p[1]) - (p1[0]-p[0])*(p2[1]-p1[1])) / np.linalg.norm(p2-p1)
         distances.append(dist)
 
-    optimal_k = ks[np.argmax(distances)]
+    return ks[np.argmax(distances)]
+
+def adaptive_elbow(data, k_range, n_init=N_INIT, seed=None, tol=0.0):
+    """
+    Same knee as elbow_k over the full k_range, fitting as few k as possible.
+    The chord distance is proportional to the vertical gap |L(k) - I(k)|
+    between the chord L through the end points and the inertia I(k), so the
+    two ends are fitted first. Inertia does not increase with k, so an unfitted
+    k between fitted a < b has I(b) <= I(k) <= I(a), which bounds its gap by
+    max(|L(k) - I(a)|, |L(k) - I(b)|). The interval holding the largest bound
+    is bisected until the best fitted gap beats every bound (or comes within
+    tol times the total inertia drop).
+    Each k is fitted exactly as sweep_full would (same seed), so the fitted
+    points are identical to the exhaustive curve.
+    Returns (optimal_k, {k: (inertia, seconds)} for the fitted k only).
+    """
+    ks = list(k_range)
+    fits = {}
+
+    def fit(k):
+        inertia, _, secs = fit_k(data, k, n_init, None if seed is None else seed + k)
+        fits[k] = (inertia, secs)
+
+    fit(ks[0])
+    fit(ks[-1])
+    first, last = ks[0], ks[-1]
+    i_first, i_last = fits[first][0], fits[last][0]
+    slack = tol * abs(i_first - i_last)
+    chord = lambda k: i_first + (i_last - i_first) * (k - first) / (last - first) if last > first else i_first
+
+    while True:
+        known = sorted(fits)
+        gaps = [abs(chord(k) - fits[k][0]) for k in known]
+        best = int(np.argmax(gaps))
+
+        # Largest possible gap of any unfitted k, and the interval it lies in
+        bound, where = -1.0, None
+        for a, b in zip(known, known[1:]):
+            for k in range(a + 1, b):
+                ub = max(abs(chord(k) - fits[a][0]), abs(chord(k) - fits[b][0]))
+                if ub > bound:
+                    bound, where = ub, (a, b)
+
+        if where is None or gaps[best] > bound or (slack > 0 and gaps[best] >= bound - slack):
+            return known[best], fits
+        a, b = where
+        fit((a + b) // 2)
+
+def iter_chunks(data, rows=CHUNK_ROWS):
+    """Consecutive row blocks as float64 arrays; only one block of a memmap is read at a time."""
+    for s in range(0, len(data), rows):
+        yield np.asarray(data[s:s + rows], dtype=np.float64)
+
+def stratified_sample(data, m, rng, rows=CHUNK_ROWS):
+    """
+    m rows drawn without replacement, stratified by file block: every block
+    of `rows` rows contributes in proportion to its size, so the sample
+    covers the whole file and is gathered one block at a time.
+    """
+    n = len(data)
+    if m >= n:
+        return np.asarray(data, dtype=np.float64)
+    starts = np.arange(0, n, rows)
+    sizes = np.minimum(rows, n - starts)
+    quota = np.floor(m * sizes / n).astype(np.int64)
+    # Hand out the rounding remainder to random blocks
+    extra = rng.choice(starts.size, m - quota.sum(), replace=False, p=sizes / n)
+    quota[extra] += 1
+    parts = []
+    for s, size, q in zip(starts, sizes, quota):
+        if q:
+            idx = np.sort(rng.choice(size, min(q, size), replace=False))
+            parts.append(np.asarray(data[s:s + size][idx], dtype=np.float64))
+    return np.concatenate(parts)
+
+def min_sq_dist(X, centers):
+    d2 = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(d2, 0).min(axis=1)
+
+def full_inertia(data, centers):
+    """Exact inertia of fixed centers over all of data, one chunk at a time."""
+    return sum(float(min_sq_dist(chunk, centers).sum()) for chunk in iter_chunks(data))
+
+def approx_sweep(data, k_range, mode, sample=SAMPLE, n_init=N_INIT, seed=None, epochs=1):
+    """
+    Elbow sweep without fitting on all of data.
+      subsample: KMeans (n_init restarts) on a stratified sample of `sample` rows
+      minibatch: MiniBatchKMeans trained with partial_fit over the data in
+                 chunks for `epochs` passes
+    Either way the inertia of every k is estimated on one shared stratified
+    evaluation sample of up to `sample` rows, scaled by n / its size. In
+    subsample mode the evaluation rows are held out from the fitted ones
+    (scoring the fitted rows would bias the inertias low); when the data has
+    no more than `sample` rows, both are simply all of it.
+    Returns (fits {k: (estimated inertia, seconds)}, centers {k: array},
+             costs (evaluation rows, len(k_range)) per-point squared distances).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(data)
+    ks = list(k_range)
+    if mode == "minibatch" or n <= sample:
+        X = F = stratified_sample(data, sample, rng)
+    else:
+        # One stratified draw, split at random into disjoint fit / evaluation rows
+        both = stratified_sample(data, min(n, 2 * sample), rng)
+        both = both[rng.permutation(len(both))]
+        F, X = both[:sample], both[sample:]
+
+    fits, centers = {}, {}
+    costs = np.empty((len(X), len(ks)))
+    for j, k in enumerate(ks):
+        start = time.perf_counter()
+        if mode == "minibatch":
+            # partial_fit seeds from a single init, so there is no n_init to set
+            km = MiniBatchKMeans(n_clusters=k, batch_size=4096,
+                                 random_state=None if seed is None else seed + k)
+            for _ in range(epochs):
+                for chunk in iter_chunks(data):
+                    km.partial_fit(chunk)
+        else:
+            km = KMeans(n_clusters=k, n_init=n_init, random_state=None if seed is None else seed + k)
+            km.fit(F)
+        centers[k] = km.cluster_centers_
+        costs[:, j] = min_sq_dist(X, centers[k])
+        fits[k] = (costs[:, j].sum() * n / len(X), time.perf_counter() - start)
+    return fits, centers, costs
+
+def knee_spread(costs, n, ks, knee, rng, reps=BOOTSTRAP):
+    """
+    How much the knee moves with the choice of evaluation rows: the knee is
+    recomputed on bootstrap resamples of the evaluation sample's per-point
+    costs (all k resampled together, keeping their correlation). The fitted
+    centers are held fixed, so the variance of the fits themselves (fit
+    sample, initialization) is not part of this spread.
+    Returns (lowest knee, highest knee, fraction of resamples agreeing with knee).
+    """
+    m = len(costs)
+    knees = []
+    for _ in range(reps):
+        idx = rng.integers(0, m, m)
+        knees.append(elbow_k(ks, costs[idx].sum(axis=0) * n / m))
+    knees = np.array(knees)
+    return int(knees.min()), int(knees.max()), float((knees == knee).mean())
+
+def run_sweep(data, opts, workers=1):
+    """
+    Elbow selection on one dataset with the options of main (strategy,
+    n_init, tol, sample, epochs, rescore, seed).
+    Returns a result dict: optimal_k, the fitted k with their inertias and
+    per-k seconds, total seconds, plus the approximation report, if any.
+    """
+    k_range = K_RANGE
+    approx = {}
+    start = time.perf_counter()
+    if opts.strategy in ("subsample", "minibatch"):
+        fits, centers, costs = approx_sweep(data, k_range, opts.strategy, opts.sample,
+                                            opts.n_init or N_INIT, opts.seed, opts.epochs)
+    elif opts.strategy == "adaptive":
+        optimal_k, fits = adaptive_elbow(data, k_range, opts.n_init or N_INIT, opts.seed, opts.tol)
+    elif opts.strategy == "warm":
+        fits = sweep_warm(data, k_range, opts.n_init or WARM_N_INIT, opts.seed)
+    else:
+        fits = sweep_full(data, k_range, opts.n_init or N_INIT, workers, opts.seed)
+    total = time.perf_counter() - start
+
+    # The adaptive search only has the k it fitted
+    ks = sorted(fits)
+    inertias = [fits[k][0] for k in ks]
+    if opts.strategy != "adaptive":
+        optimal_k = elbow_k(ks, inertias)
+
+    if opts.strategy in ("subsample", "minibatch"):
+        lo, hi, agree = knee_spread(costs, len(data), ks, optimal_k, np.random.default_rng(opts.seed))
+        approx = {"rows": len(data), "sample": len(costs), "knee_low": lo, "knee_high": hi,
+                  "knee_agreement": round(agree, 4), "max_knee_offset": int(max(optimal_k - lo, hi - optimal_k))}
+        if opts.rescore:
+            exact = full_inertia(data, centers[optimal_k])
+            approx.update({"rescored_inertia": exact,
+                           "rescore_rel_error": round(abs(fits[optimal_k][0] - exact) / exact, 6) if exact else 0.0})
+
+    return {"strategy": opts.strategy, "optimal_k": int(optimal_k), "fitted": len(ks), "k": ks,
+            "inertia": [float(x) for x in inertias], "seconds": [round(fits[k][1], 4) for k in ks],
+            "total_seconds": round(total, 4), **approx}
+
+def plot_curve(result, path):
+    plt.figure()
+    plt.plot(result["k"], result["inertia"], marker='o')
+    plt.xlabel("k")
+    plt.ylabel("Inertia")
+    plt.savefig(path)
+    plt.close()
+
+def _init_batch_worker(threads):
+    threadpool_limits(threads)
+
+def _batch_task(task):
+    """One dataset of a batch, in a pool worker: the staged .npy is memory-mapped, not sent over."""
+    name, path, opts, plot_path = task
+    result = run_sweep(np.load(path, mmap_mode="r"), opts)
+    if plot_path:
+        plot_curve(result, plot_path)
+    return result
+
+def stage_dataset(arg, stage_dir):
+    """Local .npy path of a dataset argument (downloading numbered datasets into stage_dir)."""
+    if not arg.isdigit():
+        return arg
+    load_data(arg, stage_dir)
+    return os.path.join(stage_dir, f"dataset_{int(arg)}.npy")
+
+def run_batch(opts):
+    """
+    Many datasets through one process pool: the next datasets are fetched
+    by a thread pool (opts.prefetch ahead) while earlier ones are being
+    clustered, each sweep runs in a worker, and one results row per dataset
+    is written to opts.results, in input order. A dataset that fails to
+    fetch or fit gets a row with only its error filled in; the rest of the
+    batch carries on.
+    Returns the number of failed datasets.
+    """
+    import csv
+    import tempfile
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = max(1, opts.workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    ks = list(K_RANGE)
+    if opts.plots:
+        os.makedirs(opts.plots, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            ThreadPoolExecutor(max(1, opts.prefetch)) as fetcher, \
+            Pool(workers, initializer=_init_batch_worker, initargs=(threads,)) as pool, \
+            open(opts.results, "w", newline="") as out:
+        stage_dir = opts.cache or tmp
+        table = csv.writer(out)
+        table.writerow(["dataset", "optimal_k", "strategy", "fitted", "fetch_s", "sweep_s"]
+                       + [f"inertia_k{k}" for k in ks] + ["error"])
+        failed = []
+
+        def fetch(arg):
+            start = time.perf_counter()
+            return stage_dataset(arg, stage_dir), time.perf_counter() - start
+
+        def finish(arg, fetch_s, result):
+            # result: the fetch future's or the sweep job's getter, raising its error
+            fetch_s = "" if fetch_s is None else round(fetch_s, 4)
+            try:
+                r = result()
+            except Exception as e:
+                failed.append(arg)
+                table.writerow([arg, "", opts.strategy, "", fetch_s, ""] + [""] * len(ks)
+                               + [f"{type(e).__name__}: {e}"])
+                out.flush()
+                print(f"{arg}: failed: {type(e).__name__}: {e}", file=sys.stderr)
+                return
+            by_k = dict(zip(r["k"], r["inertia"]))
+            table.writerow([arg, r["optimal_k"], r["strategy"], r["fitted"], fetch_s,
+                            r["total_seconds"]] + [by_k.get(k, "") for k in ks] + [""])
+            out.flush()
+            print(f"{arg}\t{r['optimal_k']}", flush=True)
+
+        todo = deque(enumerate(opts.datasets, 1))
+        fetching = deque()
+        running = deque()
+        while todo or fetching or running:
+            while todo and len(fetching) < max(1, opts.prefetch):
+                i, arg = todo.popleft()
+                fetching.append((i, arg, fetcher.submit(fetch, arg)))
+            if fetching:
+                i, arg, fut = fetching.popleft()
+                try:
+                    path, fetch_s = fut.result()
+                except Exception:
+                    # Reported by finish, in its turn
+                    running.append((arg, None, fut.result))
+                else:
+                    # The batch position keeps plots of same-named files apart
+                    stem = os.path.splitext(os.path.basename(arg))[0]
+                    plot_path = os.path.join(opts.plots, f"plot_{i:03d}_{stem}.png") if opts.plots else None
+                    job = pool.apply_async(_batch_task, ((arg, path, opts, plot_path),))
+                    running.append((arg, fetch_s, job.get))
+            # Keep the pool busy but bound the staged-but-unfinished datasets
+            while running and (len(running) >= workers + 1 or not (todo or fetching)):
+                finish(*running.popleft())
+
+    print(f"Results for {len(opts.datasets)} datasets -> {opts.results}"
+          + (f" ({len(failed)} failed)" if failed else ""), file=sys.stderr)
+    return len(failed)
+
+def main():
+    parser = argparse.ArgumentParser(usage="python Q1.py <dataset_num | data.npy> [more datasets ...] [options]")
+    parser.add_argument("datasets", nargs="+", metavar="dataset")
+    parser.add_argument("--strategy", choices=("full", "warm", "adaptive", "subsample", "minibatch"),
+                        default="full",
+                        help="full: every k from scratch (default); warm: k+1 seeded from k; "
+                             "adaptive: fit only the k needed to pin down the knee; "
+                             "subsample / minibatch: approximate, for datasets too large to fit whole")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes fitting k values concurrently (full strategy)")
+    parser.add_argument("--n-init", type=int,
+                        help=f"restarts per k (default: {N_INIT} full, {WARM_N_INIT} warm)")
+    parser.add_argument("--tol", type=float, default=0.0,
+                        help="adaptive: stop once the knee is within TOL x the total inertia drop "
+                             "of every unfitted k (default: 0, exact)")
+    parser.add_argument("--sample", type=int, default=SAMPLE,
+                        help="subsample/minibatch: rows fitted on (subsample) and, "
+                             f"separately, rows used to estimate inertias (default: {SAMPLE})")
+    parser.add_argument("--epochs", type=int, default=1, help="minibatch: passes over the data")
+    parser.add_argument("--rescore", action="store_true",
+                        help="subsample/minibatch: compute the exact full-data inertia of the chosen k")
+    parser.add_argument("--seed", type=int, help="random seed (default: unseeded)")
+    parser.add_argument("--cache", metavar="DIR", default=os.environ.get("Q1_CACHE"),
+                        help="keep downloaded datasets here as .npy and reuse them (env: Q1_CACHE)")
+    parser.add_argument("--report", metavar="PATH", help="write optimal_k, inertia curve and per-k timings as JSON")
+    parser.add_argument("--results", metavar="PATH",
+                        help="batch mode (implied by several datasets): results table CSV (default: results.csv)")
+    parser.add_argument("--prefetch", type=int, default=2, help="batch mode: datasets fetched ahead")
+    parser.add_argument("--plots", metavar="DIR", help="batch mode: write plot_<position>_<dataset>.png files here")
+    args = parser.parse_args()
+
+    if len(args.datasets) > 1 or args.results:
+        args.results = args.results or "results.csv"
+        if run_batch(args):
+            sys.exit(1)
+        return
+
+    data = load_data(args.datasets[0], args.cache)
+    result = run_sweep(data, args, args.workers)
+    optimal_k = result["optimal_k"]
+    plot_curve(result, "plot.png")
+
+    # stdout carries only the answer; the sweep report goes to stderr / --report
+    for k, inertia, secs in zip(result["k"], result["inertia"], result["seconds"]):
+        print(f"k={k:2d}  inertia={inertia:.6g}  {secs:.3f}s", file=sys.stderr)
+    if "knee_low" in result:
+        print(f"{args.strategy}: knee {optimal_k}, bootstrap knees {result['knee_low']}..{result['knee_high']} "
+              f"({result['knee_agreement']:.0%} agree) over {result['sample']} evaluation rows of {result['rows']} "
+              f"(evaluation noise only, fits held fixed)",
+              file=sys.stderr)
+    if "rescored_inertia" in result:
+        print(f"rescored k={optimal_k}: full inertia {result['rescored_inertia']:.6g} "
+              f"({result['rescore_rel_error']:.2%} from the estimate)", file=sys.stderr)
+    print(f"{args.strategy} sweep: {result['fitted']} k fitted in {result['total_seconds']:.3f}s", file=sys.stderr)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"dataset": args.datasets[0], **result}, f, indent=1)
+
     print(optimal_k)
 if __name__ == "__main__":
     main()
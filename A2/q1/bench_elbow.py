@@ -0,0 +1,48 @@
+import sys
+import time
+import argparse
+from Q1 import load_data, sweep_full, elbow_k, adaptive_elbow, K_RANGE, N_INIT
+
+# Usage: python bench_elbow.py <dataset_num | data.npy> [...] [--seeds 0,1,2] [--tol T]
+# Exhaustive vs adaptive elbow search on each dataset and seed: same answer?
+# How many KMeans fits (each with n_init restarts) and how much time were saved?
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("datasets", nargs="+")
+    parser.add_argument("--seeds", default="0,1,2", help="comma-separated seeds, one run of each mode per seed")
+    parser.add_argument("--tol", type=float, default=0.0)
+    parser.add_argument("--n-init", type=int, default=N_INIT)
+    args = parser.parse_args()
+
+    seeds = [int(s) for s in args.seeds.split(",") if s]
+    print(f"{'dataset':<20} {'seed':>4} {'k_full':>6} {'k_adapt':>7} {'fits_full':>9} {'fits_adapt':>10} "
+          f"{'t_full':>8} {'t_adapt':>8}")
+    total = [0, 0, 0.0, 0.0]
+    mismatches = 0
+    for ds in args.datasets:
+        data = load_data(ds)
+        for seed in seeds:
+            start = time.perf_counter()
+            fits = sweep_full(data, K_RANGE, args.n_init, seed=seed)
+            k_full = elbow_k(list(K_RANGE), [fits[k][0] for k in K_RANGE])
+            t_full = time.perf_counter() - start
+
+            start = time.perf_counter()
+            k_adapt, fitted = adaptive_elbow(data, K_RANGE, args.n_init, seed, args.tol)
+            t_adapt = time.perf_counter() - start
+
+            mismatches += k_full != k_adapt
+            total[0] += len(fits)
+            total[1] += len(fitted)
+            total[2] += t_full
+            total[3] += t_adapt
+            print(f"{ds:<20} {seed:>4} {k_full:>6} {k_adapt:>7} {len(fits):>9} {len(fitted):>10} "
+                  f"{t_full:>7.3f}s {t_adapt:>7.3f}s", flush=True)
+
+    print(f"\nfits: {total[0]} exhaustive vs {total[1]} adaptive ({1 - total[1] / total[0]:.0%} saved), "
+          f"time: {total[2]:.2f}s vs {total[3]:.2f}s, answer mismatches: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import re
+import json
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+# Usage: python dataset_server.py <dir> [--port 3000] [--format auto|npy|raw|json]
+# Local stand-in for the course dataset server, for testing Q1.load_data:
+# GET /dataset?student_id=...&dataset_num=N serves <dir>/dataset_N.npy as
+#   npy:  the .npy file itself                (Content-Type: application/x-npy)
+#   raw:  float32 bytes, shape in X-Shape     (Content-Type: application/octet-stream)
+#   json: {"X": [[...], ...]} like the real server
+# auto picks the first of these the client's Accept header lists.
+
+FORMATS = {"npy": "application/x-npy", "raw": "application/octet-stream", "json": "application/json"}
+
+def pick_format(accept, forced):
+    if forced != "auto":
+        return forced
+    offered = {ctype: fmt for fmt, ctype in FORMATS.items()}
+    for part in (accept or "").split(","):
+        ctype = part.split(";")[0].strip()
+        if ctype in offered:
+            return offered[ctype]
+    return "json"
+
+def make_handler(root, forced):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            num = parse_qs(url.query).get("dataset_num", [""])[0]
+            path = os.path.join(root, f"dataset_{num}.npy")
+            if url.path != "/dataset" or not re.fullmatch(r"\d+", num) or not os.path.exists(path):
+                self.send_error(404)
+                return
+
+            X = np.load(path)
+            fmt = pick_format(self.headers.get("Accept"), forced)
+            extra = {}
+            if fmt == "npy":
+                with open(path, "rb") as f:
+                    body = f.read()
+            elif fmt == "raw":
+                body = np.ascontiguousarray(X, dtype="<f4").tobytes()
+                extra = {"X-Shape": ",".join(map(str, X.shape)), "X-Dtype": "<f4"}
+            else:
+                body = json.dumps({"X": X.tolist()}).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", FORMATS[fmt])
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in extra.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dir", help="directory with dataset_<n>.npy files")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--format", choices=("auto",) + tuple(FORMATS), default="auto",
+                        help="response format (default: negotiated from the Accept header)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.dir, args.format))
+    print(f"Serving {args.dir} on http://127.0.0.1:{args.port} ({args.format})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()